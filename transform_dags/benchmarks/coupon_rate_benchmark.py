@@ -0,0 +1,45 @@
+"""
+Compare the precompiled parse_coupon_rate with the legacy parser of scripts/temp.py:
+checks that both classify the coupon corpus identically, then times them.
+
+    cd transform_dags && python -m benchmarks.coupon_rate_benchmark
+
+The parse_coupon_rate regression gate is in benchmarks/parser_benchmarks.
+"""
+import timeit
+from scripts.temp import examples, parse_coupon_rate as legacy_parse_coupon_rate
+from utils.data_cleaning import parse_coupon_rate
+
+# Benchmark the uncached parser: the LRU cache would otherwise hide the parsing cost
+single_pass_parse_coupon_rate = parse_coupon_rate.func
+
+
+def check_identical(values=examples):
+    """Return the values whose classification differs between the two implementations."""
+    return [
+        (value, legacy_parse_coupon_rate(value), single_pass_parse_coupon_rate(value))
+        for value in values
+        if legacy_parse_coupon_rate(value) != single_pass_parse_coupon_rate(value)
+    ]
+
+
+def time_parser(parser, values=examples, number=2000, repeat=5):
+    """Best-of-`repeat` time per call in nanoseconds over the whole corpus."""
+    def run():
+        for value in values:
+            parser(value)
+    best = min(timeit.repeat(run, number=number, repeat=repeat))
+    return best / (number * len(values)) * 1e9
+
+
+if __name__ == "__main__":
+    mismatches = check_identical()
+    for value, legacy, single_pass in mismatches:
+        print(f"MISMATCH {value!r}: legacy={legacy} single_pass={single_pass}")
+    print(f"{len(examples) - len(mismatches)}/{len(examples)} corpus values classified identically")
+
+    legacy_ns = time_parser(legacy_parse_coupon_rate)
+    single_pass_ns = time_parser(single_pass_parse_coupon_rate)
+    print(f"legacy parse_coupon_rate:      {legacy_ns:8.0f} ns/op")
+    print(f"single-pass parse_coupon_rate: {single_pass_ns:8.0f} ns/op")
+    print(f"speedup: {legacy_ns / single_pass_ns:.2f}x")
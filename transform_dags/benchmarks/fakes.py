@@ -0,0 +1,268 @@
+"""
+In-process stand-ins for MongoDB and PostgreSQL, so the ETL can be benchmarked
+without either server.
+
+FakeMongoClient serves a SyntheticCatalog and answers the ISIN_CODE query shapes
+of utils/mongo_utils; other filters (e.g. a watermark-field window) raise
+NotImplementedError, so benchmarks run with MONGO_WATERMARK_FIELD unset.
+FakePostgres keeps every table in dicts and understands the statements the ETL
+issues (prefetch SELECTs, execute_values upserts with RETURNING, watermark and
+run-stats rows). Of the fingerprinted ETL tables only keys, ids and data_hash
+are kept, so the fake adds little to the measured peak memory. Transactions and
+savepoints are accepted but not isolated: a rolled-back write stays visible.
+ON CONFLICT DO NOTHING conflicts on the inserted columns only; column defaults
+that are part of a real key (e.g. isin_rta_map's effective_from) are not
+modelled, so the ETL must not rely on them to deduplicate.
+"""
+import re
+import threading
+from contextlib import contextmanager
+from itertools import count
+
+from benchmarks.synthetic_data import isin_index
+
+
+# ---------------- MONGODB ----------------
+class FakeCollection:
+    def __init__(self, catalog, name):
+        self.catalog = catalog
+        self.name = name
+
+    def _indexes(self, query):
+        """Document indexes matching the query, in ISIN_CODE (= _id) order.
+
+        Only ISIN_CODE conditions ($in, $gt, $exists, $ne: None) are understood;
+        anything else, such as a watermark-field window, raises NotImplementedError
+        rather than silently matching every document.
+        """
+        unsupported = set(query) - {"ISIN_CODE"}
+        isin_filter = query.get("ISIN_CODE", {})
+        if isinstance(isin_filter, dict):
+            unsupported |= {f"ISIN_CODE.{op}" for op in set(isin_filter) - {"$in", "$gt", "$exists", "$ne"}}
+            if isin_filter.get("$exists") is False or isin_filter.get("$ne", None) is not None:
+                unsupported.add("ISIN_CODE")
+        else:
+            unsupported.add("ISIN_CODE")
+        if unsupported:
+            raise NotImplementedError(f"FakeCollection does not support filtering on {sorted(unsupported)}")
+
+        if "$in" in isin_filter:
+            indexes = (isin_index(isin) for isin in isin_filter["$in"])
+            return sorted(index for index in indexes if index is not None and index < self.catalog.num_isins)
+        low = 0
+        if isin_filter.get("$gt") is not None:
+            low = (isin_index(isin_filter["$gt"]) or -1) + 1
+        return range(low, self.catalog.num_isins)
+
+    @staticmethod
+    def _project(doc, projection):
+        if not projection:
+            return doc
+        fields = [field for field, include in projection.items() if include]
+        projected = {field: doc[field] for field in fields if field in doc}
+        if projection.get("_id", 1):
+            projected["_id"] = doc["_id"]
+        return projected
+
+    def find(self, filter=None, projection=None, sort=None, **kwargs):
+        indexes = self._indexes(filter or {})
+        if sort and sort[0][1] < 0:
+            indexes = reversed(indexes)
+        for index in indexes:
+            yield self._project(self.catalog.document(self.name, index), projection)
+
+    def find_one(self, filter=None, projection=None, sort=None, **kwargs):
+        return next(iter(self.find(filter, projection, sort)), None)
+
+    def count_documents(self, filter):
+        return sum(1 for _ in self._indexes(filter))
+
+
+class FakeDatabase:
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def __getitem__(self, collection):
+        return FakeCollection(self.catalog, collection)
+
+
+class FakeMongoClient:
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def __getitem__(self, db_name):
+        return FakeDatabase(self.catalog)
+
+    def close(self):
+        pass
+
+
+# ---------------- POSTGRESQL ----------------
+_SELECT_RE = re.compile(r"SELECT (.+?) FROM (\w+)(?: WHERE (\w+) = (ANY\(%s\)|%s))?$", re.S)
+_INSERT_RE = re.compile(
+    r"INSERT INTO (\w+) \((.+?)\)\s+VALUES (%s|\((.+?)\))"
+    r"(?:\s+ON CONFLICT (?:\((\w+)\)\s+DO UPDATE SET .+?|DO NOTHING))?"
+    r"(?:\s+RETURNING (.+))?$",
+    re.S,
+)
+_PASS_THROUGH = ("CREATE", "SAVEPOINT", "RELEASE", "ROLLBACK")
+
+
+class FakePostgres:
+    """All tables of the fake database: {table: {key: {column: value}}}."""
+
+    def __init__(self):
+        self.tables = {}
+        self.keys = {}  # table → conflict column its rows are keyed on
+        self.isin_index = {}  # table without conflict column → {isin_code: [row]}
+        self.lock = threading.Lock()
+        self._serials = {}
+        self.statements = 0
+
+    def _serial(self, table):
+        return next(self._serials.setdefault(table, count(1)))
+
+    def select(self, sql, params):
+        columns, table, where_column, where = _SELECT_RE.match(sql.strip()).groups()
+        columns = [column.strip() for column in columns.split(",")]
+        store = self.tables.get(table, {})
+        rows = store.values()
+        if where_column:
+            wanted = set(params[0]) if where.startswith("ANY") else {params[0]}
+            if where_column == self.keys.get(table):
+                rows = [store[key] for key in wanted if key in store]
+            elif where_column == "isin_code" and table in self.isin_index:
+                index = self.isin_index[table]
+                rows = [row for isin in wanted for row in index.get(isin, ())]
+            else:
+                rows = [row for row in rows if row.get(where_column) in wanted]
+        return [tuple(row.get(column) for column in columns) for row in rows]
+
+    def insert(self, sql, rows):
+        """Apply an INSERT for value tuples; returns (rowcount, RETURNING rows)."""
+        match = _INSERT_RE.match(sql.strip())
+        table, columns, _, _, conflict_column, returning = match.groups()
+        columns = [column.strip() for column in columns.split(",")]
+        returning = [column.strip() for column in returning.split(",")] if returning else []
+        store = self.tables.setdefault(table, {})
+        if conflict_column:
+            self.keys[table] = conflict_column
+        written, returned = 0, []
+        for values in rows:
+            row = dict(zip(columns, values))
+            if conflict_column:
+                key = row[conflict_column]
+                if "data_hash" in row:
+                    row = {conflict_column: key, "data_hash": row["data_hash"]}
+            elif "ON CONFLICT" in sql:
+                key = tuple(values)  # DO NOTHING on the whole row
+            else:
+                key = self._serial(table)  # plain INSERT: always a new row
+            existing = store.get(key)
+            if existing is not None:
+                if not conflict_column or existing.get("data_hash", object()) == row.get("data_hash"):
+                    continue  # DO NOTHING, or unchanged fingerprint (WHERE ... IS DISTINCT FROM)
+                existing.update(row)
+                row, inserted = existing, False
+            else:
+                store[key] = row
+                inserted = True
+                if not conflict_column and "isin_code" in row:
+                    self.isin_index.setdefault(table, {}).setdefault(row["isin_code"], []).append(row)
+            written += 1
+            for column in returning:
+                if column not in row and column != "(xmax = 0)":
+                    row[column] = self._serial(table)  # SERIAL id column
+            if returning:
+                returned.append(tuple(inserted if column == "(xmax = 0)" else row[column] for column in returning))
+        return written, returned
+
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.rowcount = -1
+        self._results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        statement = sql.strip()
+        with self.database.lock:
+            self.database.statements += 1
+            if statement.startswith(_PASS_THROUGH):
+                self._results = []
+            elif statement.startswith("SELECT"):
+                self._results = self.database.select(statement, params)
+                self.rowcount = len(self._results)
+            elif statement.startswith("INSERT"):
+                # Single-row INSERT: %s placeholders take params in order, anything else is kept as text
+                values = iter(params or ())
+                placeholders = _INSERT_RE.match(statement).group(4).split(",")
+                row = tuple(next(values) if item.strip() == "%s" else item.strip() for item in placeholders)
+                self.rowcount, self._results = self.database.insert(statement, [row])
+            else:
+                raise NotImplementedError(f"FakePostgres cannot run: {statement[:80]}")
+
+    def execute_values(self, sql, values, fetch=False):
+        with self.database.lock:
+            self.database.statements += 1
+            self.rowcount, returned = self.database.insert(sql, values)
+        return returned if fetch else None
+
+    def fetchall(self):
+        return list(self._results)
+
+
+class FakeConnection:
+    closed = 0
+
+    def __init__(self, database):
+        self.database = database
+
+    def cursor(self):
+        return FakeCursor(self.database)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def fake_execute_values(cur, sql, argslist, template=None, page_size=100, fetch=False):
+    """Drop-in for psycopg2.extras.execute_values on a FakeCursor."""
+    return cur.execute_values(sql, list(argslist), fetch=fetch)
+
+
+# ---------------- WIRING ----------------
+def install_fakes(catalog, fake_postgres=True):
+    """
+    Point the ETL at a FakeMongoClient serving `catalog` and, with `fake_postgres`,
+    at a fresh FakePostgres (otherwise the configured Postgres is used).
+    Patches the names the ETL modules imported; returns the FakePostgres or None.
+    """
+    import scripts.isin_profile_transform as transform
+    import utils.postgres_utils as postgres_utils
+
+    transform.get_mongo_client = lambda: FakeMongoClient(catalog)
+    transform.MONGO_WATERMARK_FIELD = None  # watermark windows are not served by the fake
+    if not fake_postgres:
+        return None
+
+    database = FakePostgres()
+
+    @contextmanager
+    def postgres_connection():
+        yield FakeConnection(database)
+
+    transform.postgres_connection = postgres_connection
+    transform.get_postgres_pool = lambda *args, **kwargs: None
+    transform.close_postgres_pool = lambda: None
+    postgres_utils.execute_values = fake_execute_values
+    return database
+
@@ -0,0 +1,153 @@
+"""
+Microbenchmarks of the utils/data_cleaning parsers, in ns/op.
+
+    cd transform_dags && python -m benchmarks.parser_benchmarks            # compare to baselines
+    cd transform_dags && python -m benchmarks.parser_benchmarks --update   # store new baselines
+
+Each parser runs over a realistic value distribution: the synthetic field pools
+(padded and unpadded dates, decimals, "-" / "N.A." placeholders) and the coupon
+corpus of scripts/temp.py. Memoized parsers are measured without their cache.
+Every repeat of a parser is timed between two runs of a fixed calibration loop
+and divided by the faster of them; the median of these ratios is what is
+stored and compared, so machine speed and frequency drift cancel out. A parser
+over its baseline by more than --threshold is measured again before it is
+reported, and the run exits non-zero only if it is still over. Baselines are
+recorded on the Python minor version of the Airflow image (see the Dockerfile);
+on any other version the run fails unless --update is given.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+from functools import partial
+from benchmarks.synthetic_data import PARSER_POOLS
+from scripts.temp import examples as COUPON_RATE_EXAMPLES
+from utils.data_cleaning import (
+    clean_string, parse_date, parse_decimal, parse_int, parse_bool,
+    normalize_interest_frequency, parse_coupon_rate
+)
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "parser_baselines.json")
+
+# parser name → (uncached callable, values)
+PARSER_CASES = {
+    "clean_string": (clean_string, [
+        "CRISIL AAA", "  Issuer 00042 Limited ", "-", "N.A.", "NA", None, 1000, "Quarterly", "",
+    ]),
+    "parse_date": (parse_date.func, PARSER_POOLS[parse_date]),
+    "parse_decimal": (partial(parse_decimal.func, "FACE_VALUE_RS"), PARSER_POOLS[parse_decimal]),
+    "parse_int": (parse_int, PARSER_POOLS[parse_int]),
+    "parse_bool": (parse_bool, PARSER_POOLS[parse_bool] + [True, None]),
+    "normalize_interest_frequency": (
+        normalize_interest_frequency.func, PARSER_POOLS[normalize_interest_frequency]
+    ),
+    "parse_coupon_rate": (parse_coupon_rate.func, COUPON_RATE_EXAMPLES),
+}
+
+
+def _calibration():
+    """Fixed pure-Python workload the parser timings are normalized by."""
+    total = 0
+    for value in ("12", "345", "6789", "N.A."):
+        total += len(value.strip().upper())
+    return total
+
+
+def _ns_per_op(func, values, number):
+    """Time per call in nanoseconds of one pass of `number` loops over `values`."""
+    def run():
+        for value in values:
+            func(value)
+    return timeit.timeit(run, number=number) / (number * len(values)) * 1e9
+
+
+def calibration_ns(number=200):
+    """Time per call in nanoseconds of the calibration loop."""
+    return _ns_per_op(lambda _: _calibration(), [None] * 50, number)
+
+
+def measure_parser(func, values, number=200, repeat=9):
+    """Median over `repeat` runs of the parser's time in calibration units (1.0 = one calibration loop)."""
+    ratios = []
+    for _ in range(repeat):
+        before = calibration_ns(number)
+        ns = _ns_per_op(func, values, number)
+        ratios.append(ns / min(before, calibration_ns(number)))
+    return statistics.median(ratios)
+
+
+def measure(number=200, repeat=9, names=None):
+    """Return {"calibration_ns": ..., "parsers": {name: time in calibration units}}."""
+    calibration_ns(number)  # warm-up, so CPU frequency scaling does not skew the first measurement
+    parsers = {
+        name: round(measure_parser(func, values, number, repeat), 4)
+        for name, (func, values) in PARSER_CASES.items()
+        if names is None or name in names
+    }
+    calibration = statistics.median(calibration_ns(number) for _ in range(repeat))
+    return {"calibration_ns": round(calibration, 2), "parsers": parsers}
+
+
+def compare(results, baselines, threshold):
+    """Return [(name, ratio to baseline)] of the parsers slower than their baseline by more than `threshold`."""
+    regressions = []
+    for name, units in results["parsers"].items():
+        baseline = baselines["parsers"].get(name)
+        if baseline is None:
+            continue
+        ratio = units / baseline
+        ns = units * results["calibration_ns"]
+        print(f"{name:<30} {ns:>10.1f} ns/op   {units:>8.3f} units   baseline {baseline:>8.3f} units   {ratio:5.2f}x")
+        if ratio > 1 + threshold:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--update", action="store_true", help="store the measured timings as the new baselines")
+    parser.add_argument("--threshold", type=float, default=0.5, help="allowed slowdown (0.5 = 50%%)")
+    parser.add_argument("--number", type=int, default=200, help="passes over each value list per repeat")
+    parser.add_argument("--repeat", type=int, default=9, help="repeats per parser (the median is used)")
+    parser.add_argument("--baselines", default=BASELINE_FILE)
+    args = parser.parse_args()
+
+    python = platform.python_version()
+    if not args.update and os.path.exists(args.baselines):
+        with open(args.baselines) as f:
+            baselines = json.load(f)
+        recorded = baselines.get("python", "")
+        if recorded.split(".")[:2] != python.split(".")[:2]:
+            print(
+                f"Baselines were recorded on Python {recorded or 'unknown'}, this is {python}: "
+                "run on the image's Python, or re-record with --update"
+            )
+            return 2
+
+    results = measure(number=args.number, repeat=args.repeat)
+    if args.update or not os.path.exists(args.baselines):
+        results["python"] = python
+        with open(args.baselines, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        for name, units in results["parsers"].items():
+            print(f"{name:<30} {units * results['calibration_ns']:>10.1f} ns/op   {units:>8.3f} units")
+        print(f"Baselines written to {args.baselines}")
+        return 0
+
+    regressions = compare(results, baselines, args.threshold)
+    if regressions:
+        # Confirm with a second measurement, so a noisy run does not fail the gate
+        print(f"Re-measuring {', '.join(name for name, _ in regressions)}")
+        retry = measure(number=args.number, repeat=args.repeat, names={name for name, _ in regressions})
+        regressions = compare(retry, baselines, args.threshold)
+    for name, ratio in regressions:
+        print(f"REGRESSION {name}: {ratio:.2f}x its baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+End-to-end benchmark of run_isin_profile_transform on synthetic data.
+
+    cd transform_dags && python -m benchmarks.run_benchmark --scales 10000,100000,1000000
+
+Every scale runs in a fresh process, so peak memory is measured per scale. Mongo is
+always the in-process FakeMongoClient; Postgres is FakePostgres unless
+--local-postgres is given, in which case the database at PG_DSN is used (the
+tables of old_code/create_tables.sql must exist). With the fakes, mongo_fetch
+includes the cost of generating the synthetic documents.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+def run_scale(num_isins, num_issuers, num_rtas, workers, pipeline, num_shards, batch_size, local_postgres):
+    """Run one full-refresh ETL over `num_isins` synthetic ISINs and return its measurements."""
+    from benchmarks.fakes import install_fakes
+    from benchmarks.synthetic_data import SyntheticCatalog
+    import scripts.isin_profile_transform as transform
+
+    catalog = SyntheticCatalog(num_isins, num_issuers=num_issuers, num_rtas=num_rtas)
+    install_fakes(catalog, fake_postgres=not local_postgres)
+    if batch_size:
+        transform.BATCH_SIZE = batch_size
+
+    started = time.perf_counter()
+    stats = transform.run_isin_profile_transform(
+        full_refresh=True,
+        workers=workers,
+        pipeline=pipeline,
+        shard=0 if num_shards else None,
+        num_shards=num_shards,
+    )
+    elapsed = time.perf_counter() - started
+    run_stats = stats.get("run_stats", {})
+    return {
+        "isins": stats.get("isins", 0),
+        "loaded": stats.get("loaded", 0),
+        "failed": stats.get("failed", 0),
+        "seconds": round(elapsed, 3),
+        "isins_per_second": round(stats.get("isins", 0) / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),  # KB on Linux
+        "latency_ms": run_stats.get("latency_ms", {}),
+        "stage_seconds": run_stats.get("stage_seconds", {}),
+    }
+
+
+def print_report(results):
+    """Print one summary line per scale, then the per-stage times."""
+    print(f"{'ISINs':>10} {'seconds':>9} {'ISINs/s':>9} {'peak MB':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for scale, result in results.items():
+        latency = result["latency_ms"]
+        print(
+            f"{scale:>10} {result['seconds']:>9} {result['isins_per_second']:>9} {result['peak_rss_mb']:>8} "
+            f"{latency.get('p50')!s:>8} {latency.get('p95')!s:>8} {latency.get('p99')!s:>8}"
+        )
+    print()
+    stages = sorted({stage for result in results.values() for stage in result["stage_seconds"]})
+    print(f"{'stage seconds':<28}" + "".join(f"{scale:>12}" for scale in results))
+    for stage in stages:
+        print(f"{stage:<28}" + "".join(f"{result['stage_seconds'].get(stage, 0):>12}" for result in results.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="10000,100000,1000000", help="comma-separated ISIN counts")
+    parser.add_argument("--issuers", type=int, default=2000, help="distinct issuers (company_info rows)")
+    parser.add_argument("--rtas", type=int, default=50, help="distinct RTAs (rta_info rows)")
+    parser.add_argument("--workers", type=int, default=None, help="default ETL_WORKERS")
+    parser.add_argument("--pipeline", action="store_true", help="run extract/map/load as a pipeline")
+    parser.add_argument("--num-shards", type=int, default=None, help="run shard 0 of N instead of a full scan")
+    parser.add_argument("--batch-size", type=int, default=None, help="default BATCH_SIZE")
+    parser.add_argument("--local-postgres", action="store_true", help="write to the configured Postgres")
+    parser.add_argument("--log-level", default="WARNING", help="ETL log level during the runs")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    os.environ["LOG_LEVEL"] = args.log_level  # read by the fresh process of every scale
+    results = {}
+    for scale in (int(value) for value in args.scales.split(",")):
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results[scale] = executor.submit(
+                run_scale, scale, args.issuers, args.rtas, args.workers, args.pipeline,
+                args.num_shards, args.batch_size, args.local_postgres,
+            ).result()
+        print(f"{scale} ISINs: {results[scale]['seconds']}s, {results[scale]['isins_per_second']} ISINs/s", flush=True)
+
+    print()
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
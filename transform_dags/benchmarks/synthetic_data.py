@@ -0,0 +1,130 @@
+"""
+Deterministic synthetic Mongo documents for benchmarking the ISIN profile ETL.
+
+Documents are built on demand from their index, so a catalog of a million ISINs
+never has to be held in memory. Every field of the TABLE_SPECS gets values drawn
+from a pool matching its parser, including the messy inputs seen in production
+("-", "N.A.", unpadded dates, coupon remarks).
+"""
+import zlib
+from datetime import date, timedelta
+from mappings.postgres_mappings import (
+    TABLE_SPECS, coupon_rate_value, strict_bool, string_list
+)
+from utils.data_cleaning import (
+    parse_date, parse_decimal, parse_int, parse_bool, normalize_interest_frequency
+)
+from scripts.temp import examples as COUPON_RATE_EXAMPLES
+
+_STEP = 2654435761  # Knuth's multiplicative hash: spreads consecutive indexes over a pool
+
+
+def _date_pool(size=4000):
+    start = date(2000, 1, 1)
+    values = []
+    for k in range(size):
+        day = start + timedelta(days=k * 3)
+        if k % 50 == 0:
+            values.append(f"{day.day}-{day.month}-{day.year}")  # unpadded: strptime slow path
+        elif k % 5 == 0:
+            values.append(day.strftime("%d/%m/%Y"))
+        else:
+            values.append(day.strftime("%d-%m-%Y"))
+    return values + ["-", "N.A.", ""] * 40
+
+
+def _decimal_pool(size=3000):
+    values = [f"{k * 0.37:.2f}" for k in range(1, size)] + [str(k * 1000) for k in range(1, 100)]
+    return values + ["-", "N.A.", "NA"] * 100
+
+
+def _text_pool(field, size=50):
+    return [f"{field.replace('_', ' ').title()} {k}" for k in range(size)] + ["-", "N.A."]
+
+
+# Value pools by parser; clean_string fields get a per-field text pool
+PARSER_POOLS = {
+    parse_date: _date_pool(),
+    parse_decimal: _decimal_pool(),
+    parse_int: [str(k) for k in range(200)] + [f"{k}.0" for k in range(20)] + [7, 365, "-", ""],
+    parse_bool: ["Yes", "No", "TRUE", "false", "N.A.", "-"],
+    strict_bool: [True, False, True, "Yes", None],
+    coupon_rate_value: [value for value in COUPON_RATE_EXAMPLES],
+    normalize_interest_frequency: [
+        "Monthly", "Quarterly", "Semi Annual", "Half yearly", "Twice a year", "Annually",
+        "Once a year", "On Maturity", "Cumulative", "N.A.", "-",
+    ],
+    string_list: ["CRISIL AAA", "ICRA AA+", "CARE A1+", "IND AA", "BWR A", "N.A.", None],
+}
+
+# Parsers that win over clean_string when one Mongo field feeds several columns
+_PARSER_PRIORITY = [coupon_rate_value, normalize_interest_frequency, parse_date, parse_decimal,
+                    parse_int, parse_bool, strict_bool, string_list]
+
+
+def isin_code(index):
+    """12-character ISIN for an index; codes sort in index order."""
+    return f"INE{index:09d}"
+
+
+def isin_index(isin):
+    """Inverse of isin_code, or None for codes the generator never produces."""
+    if len(isin) != 12 or not isin.startswith("INE") or not isin[3:].isdigit():
+        return None
+    return int(isin[3:])
+
+
+def _field_pools(spec):
+    """{mongo_field: (pool, offset)} for a table spec."""
+    parsers = {}
+    for field in spec.fields:
+        parsers.setdefault(field.mongo_field, []).append(field.parser)
+    pools = {}
+    for mongo_field, field_parsers in parsers.items():
+        if mongo_field == "ISIN_CODE":
+            continue
+        special = [parser for parser in _PARSER_PRIORITY if parser in field_parsers]
+        pool = PARSER_POOLS[special[0]] if special else _text_pool(mongo_field)
+        pools[mongo_field] = (pool, zlib.crc32(mongo_field.encode()))
+    return pools
+
+
+class SyntheticCatalog:
+    """
+    `num_isins` ISINs, each with one document per Mongo collection. Company and RTA
+    documents are shared by `num_issuers` issuers and `num_rtas` RTAs, which sets
+    the cardinality of the company_info / rta_info dimensions. Each document also
+    carries `unmapped_fields` padding fields that no mapping reads.
+    """
+
+    def __init__(self, num_isins, num_issuers=2000, num_rtas=50, unmapped_fields=10):
+        self.num_isins = num_isins
+        self.num_issuers = max(1, num_issuers)
+        self.num_rtas = max(1, num_rtas)
+        # Scraped fields no mapping reads (page snippets, raw tables), as in the real collections
+        self._unmapped = {f"RAW_FIELD_{k:02d}": "x" * 200 for k in range(unmapped_fields)}
+        self._pools = {spec.collection: _field_pools(spec) for spec in TABLE_SPECS.values()}
+        self._shared = {"isin_company_info": {}, "isin_rta_info": {}}
+
+    def _build(self, collection, index):
+        doc = dict(self._unmapped)
+        for mongo_field, (pool, offset) in self._pools[collection].items():
+            doc[mongo_field] = pool[(index * _STEP + offset) % len(pool)]
+        return doc
+
+    def document(self, collection, index):
+        """The document of ISIN `index` in `collection` (`_id` is the index)."""
+        if collection == "isin_company_info":
+            shared_index = index % self.num_issuers
+            key, name = "ISSUER_NAME", f"Issuer {shared_index:05d} Limited"
+        elif collection == "isin_rta_info":
+            shared_index = index % self.num_rtas
+            key, name = "RTA_NAME", f"Registrar {shared_index:03d} Private Limited"
+        else:
+            return {"_id": index, "ISIN_CODE": isin_code(index), **self._build(collection, index)}
+
+        # Every ISIN of an issuer/RTA carries the same dimension document
+        shared = self._shared[collection]
+        if shared_index not in shared:
+            shared[shared_index] = {**self._build(collection, shared_index), key: name}
+        return {"_id": index, "ISIN_CODE": isin_code(index), **shared[shared_index]}
@@ -1,25 +1,44 @@
 # utils/database_config.py
 from pymongo import MongoClient
+from bson.raw_bson import RawBSONDocument
 import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import os
+import threading
 from config.logging_config import setup_logging
+from config.etl_config import (
+    PG_POOL_MIN_CONN, PG_POOL_MAX_CONN, MONGO_COMPRESSORS, MONGO_MAX_POOL_SIZE, MONGO_RAW_BSON
+)
 
 load_dotenv()
 
 logger = setup_logging()  # Use centralized logger
 
+_pg_pool = None
+_pg_pool_lock = threading.Lock()
 
-def get_mongo_client():
-    """Return a MongoDB client instance."""
+
+def get_mongo_client(compressors=MONGO_COMPRESSORS, max_pool_size=MONGO_MAX_POOL_SIZE, raw_bson=MONGO_RAW_BSON):
+    """
+    Return a MongoDB client instance. With `raw_bson`, documents are returned as
+    RawBSONDocument and only decoded when the mappers read them.
+    """
     mongo_uri = os.getenv("MONGO_URI")
     if not mongo_uri:
         logger.error("MONGO_URI environment variable not set")
         raise ValueError("MONGO_URI environment variable not set")
 
-    logger.info("Creating MongoDB client")
+    options = {"maxPoolSize": max_pool_size}
+    if compressors:
+        options["compressors"] = compressors
+    if raw_bson:
+        options["document_class"] = RawBSONDocument
+
+    logger.info(f"Creating MongoDB client (compressors={compressors or 'none'}, maxPoolSize={max_pool_size}, raw_bson={raw_bson})")
     try:
-        client = MongoClient(mongo_uri)
+        client = MongoClient(mongo_uri, **options)
         client.admin.command("ping")  # Test connection
         logger.info("MongoDB client connected successfully")
         return client
@@ -54,3 +73,48 @@ def get_postgres_connection():
     except Exception as e:
         logger.exception(f"Failed to connect to PostgreSQL: {e}")
         raise
+
+
+def get_postgres_pool(minconn=PG_POOL_MIN_CONN, maxconn=PG_POOL_MAX_CONN):
+    """Return the run-scoped PostgreSQL connection pool, creating it on first use."""
+    global _pg_pool
+    with _pg_pool_lock:
+        if _pg_pool is None or _pg_pool.closed:
+            pg_dsn = os.getenv("PG_DSN")
+            if not pg_dsn:
+                logger.error("PG_DSN environment variable not set")
+                raise ValueError("PG_DSN environment variable not set")
+
+            logger.info(f"Creating PostgreSQL connection pool (min={minconn}, max={maxconn})")
+            try:
+                _pg_pool = ThreadedConnectionPool(minconn, maxconn, pg_dsn)
+                logger.info("PostgreSQL connection pool created successfully")
+            except Exception as e:
+                logger.exception(f"Failed to create PostgreSQL connection pool: {e}")
+                raise
+        return _pg_pool
+
+
+@contextmanager
+def postgres_connection():
+    """Check out a pooled PostgreSQL connection and give it back when done.
+
+    Connections returned with an open or failed transaction are rolled back by
+    the pool, so a failed batch never leaks state into the next checkout.
+    """
+    pool = get_postgres_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn, close=conn.closed != 0)
+
+
+def close_postgres_pool():
+    """Close every connection in the run-scoped pool."""
+    global _pg_pool
+    with _pg_pool_lock:
+        if _pg_pool is not None and not _pg_pool.closed:
+            _pg_pool.closeall()
+            logger.info("PostgreSQL connection pool closed")
+        _pg_pool = None
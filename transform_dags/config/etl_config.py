@@ -14,11 +14,12 @@ MONGO_COLLECTIONS = [
     "isin_rta_info"
 ]
 
+# Load order follows the foreign keys: isin_basic_info before everything that references it
 POSTGRES_TABLES = [
-    "company_info",
-    "isin_company_map",
     "isin_basic_info",
     "isin_detailed_info",
+    "company_info",
+    "isin_company_map",
     "rta_info",
     "isin_rta_map"
     # "migration_logs"  # Uncomment if used for ETL logging
@@ -26,6 +27,71 @@ POSTGRES_TABLES = [
 BATCH_SIZE = 100
 TEST_MODE_LIMIT = 2
 
+# Documents per round trip of the streaming Mongo cursors
+MONGO_CURSOR_BATCH_SIZE = int(os.getenv("MONGO_CURSOR_BATCH_SIZE", 1000))
+
+# MongoClient options: wire compressors in order of preference (the server picks the
+# first it supports; "zstd" needs the zstandard package), connection pool size, and
+# whether documents stay raw BSON, decoded only when a field is read
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zlib")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+MONGO_RAW_BSON = os.getenv("MONGO_RAW_BSON", "false").lower() in ("1", "true", "yes")
+
+# Incremental extraction: documents are picked up when this update timestamp field
+# (set by the scrapers on every insert and update) is above the last run's watermark.
+# Unset, every run is a full scan. "_id" is not accepted: an ObjectId only moves
+# forward on inserts, so documents updated in place would never be extracted again.
+MONGO_WATERMARK_FIELD = os.getenv("MONGO_WATERMARK_FIELD") or None
+WATERMARK_TABLE = "etl_watermarks"
+
+# Resumable runs: the last committed ISIN of every run (and shard) is checkpointed here,
+# so a retry or the next run carries on after it
+CHECKPOINT_TABLE = "etl_checkpoints"
+# Optional wall-clock budget of a run in seconds (0 = none; op_kwargs "time_budget"
+# overrides). No new batch is started once it is spent; batches in flight still finish.
+ETL_TIME_BUDGET_SECONDS = float(os.getenv("ETL_TIME_BUDGET_SECONDS", 0))
+
+# One row of per-stage timings, throughput and per-table row counts per run (and shard)
+RUN_STATS_TABLE = "etl_run_stats"
+
+# LRU cache sizes of the memoized parsers in utils/data_cleaning ("default" applies to the rest)
+PARSER_CACHE_SIZES = {
+    "default": int(os.getenv("PARSER_CACHE_SIZE", 4096)),
+    "parse_date": int(os.getenv("PARSER_CACHE_SIZE_DATE", 16384)),
+    "parse_decimal": int(os.getenv("PARSER_CACHE_SIZE_DECIMAL", 16384)),
+}
+
+# Worker threads mapping and loading batches in parallel (op_kwargs "workers" overrides)
+ETL_WORKERS = int(os.getenv("ETL_WORKERS", 4))
+
+# Pipelined mode: extract, map and load run concurrently, linked by bounded queues
+# of PIPELINE_QUEUE_SIZE batches (op_kwargs "pipeline" overrides)
+ETL_PIPELINE = os.getenv("ETL_PIPELINE", "false").lower() in ("1", "true", "yes")
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 4))
+
+# Number of mapped isin_profile_etl tasks the DAG splits the ISIN space into
+ETL_NUM_SHARDS = int(os.getenv("ETL_NUM_SHARDS", 8))
+
+# PostgreSQL connection pool (connections are reused for the whole run)
+PG_POOL_MIN_CONN = int(os.getenv("PG_POOL_MIN_CONN", 1))
+PG_POOL_MAX_CONN = int(os.getenv("PG_POOL_MAX_CONN", 4))
+
+# Directory of the rotating log file (profiling output is written there too)
+LOG_DIR = os.getenv("LOG_DIR", "/opt/airflow/dags/logs")
+
+# Logging: level of the isin_etl logger, and the share of ISINs (0.0-1.0) whose raw
+# documents and mapped rows are dumped at INFO (every ISIN is dumped at DEBUG)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 0.0))
+# Hand log records to a background writer thread instead of writing them on the caller's thread
+LOG_QUEUE = os.getenv("LOG_QUEUE", "false").lower() in ("1", "true", "yes")
+
+# Opt-in profiling (op_kwargs "profile" overrides): "run" profiles the whole run,
+# "batches" every ETL_PROFILE_EVERY-th batch; output goes to LOG_DIR
+ETL_PROFILE = os.getenv("ETL_PROFILE", "").lower() or None
+ETL_PROFILE_EVERY = int(os.getenv("ETL_PROFILE_EVERY", 20))
+ETL_PROFILE_TOP_N = int(os.getenv("ETL_PROFILE_TOP_N", 25))
+
 # ETL Configuration for isin_profile_transform_dag
 ETL_CONFIG = {
     'transform_dag': {
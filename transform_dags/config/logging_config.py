@@ -1,15 +1,39 @@
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 import os
 import sys
+from queue import Queue
+from config.etl_config import LOG_DIR, LOG_LEVEL, LOG_QUEUE
 
-def setup_logging(logger_name="isin_etl", log_dir="/opt/airflow/dags/logs"):
-    """Configure logging with stdout (for Airflow) and optional file rotation."""
+# Queued loggers: logger name → [QueueHandler, real handlers, running QueueListener or None]
+_queued_loggers = {}
+
+
+class _RootForwarder(logging.Handler):
+    """Hand records to whatever handlers the root logger has when they are written."""
+
+    def emit(self, record):
+        logging.getLogger().handle(record)
+
+
+def setup_logging(logger_name="isin_etl", log_dir=LOG_DIR, level=LOG_LEVEL, use_queue=LOG_QUEUE):
+    """
+    Configure logging with file rotation, plus stdout when nothing else prints the records.
+    When the root logger already has handlers (Airflow routes them to the task log),
+    records reach them instead of a stdout handler of our own.
+    With `use_queue`, records are handed to a QueueHandler and written by a background
+    QueueListener thread, so log calls never block on file or stdout I/O.
+    """
     logger = logging.getLogger(logger_name)
-    if logger.hasHandlers():
-        return logger  # Avoid adding duplicate handlers
+    # Set on every call, so the level is LOG_LEVEL rather than inherited from Airflow's
+    # root logger. Handlers follow it, so disabled records are dropped before formatting.
+    logger.setLevel(level)
 
-    logger.setLevel(logging.DEBUG)  # Capture everything
+    # Only this logger's own handlers count: hasHandlers() would also see the root
+    # logger's, which Airflow always configures
+    if logger.handlers:
+        return logger  # Avoid adding duplicate handlers
 
     # Ensure logs directory exists
     os.makedirs(log_dir, exist_ok=True)
@@ -20,21 +44,73 @@ def setup_logging(logger_name="isin_etl", log_dir="/opt/airflow/dags/logs"):
         maxBytes=10 * 1024 * 1024,  # 10 MB
         backupCount=5
     )
-    file_handler.setLevel(logging.DEBUG)
     file_formatter = logging.Formatter(
         "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
     )
     file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
 
-    # Stream handler for Airflow logs
-    stream_handler = logging.StreamHandler(sys.stdout)
-    stream_handler.setLevel(logging.DEBUG)
-    stream_formatter = logging.Formatter(
-        "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
-    )
-    stream_handler.setFormatter(stream_formatter)
-    logger.addHandler(stream_handler)
+    handlers = [file_handler]
+    root_configured = bool(logging.getLogger().handlers)
+    if not root_configured:
+        # Stream handler for standalone runs
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_formatter = logging.Formatter(
+            "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+        )
+        stream_handler.setFormatter(stream_formatter)
+        handlers.append(stream_handler)
+
+    if use_queue:
+        if root_configured:
+            # The listener writes to root's handlers as they are at that moment (Airflow swaps
+            # in the task handler after import); propagating as well would log twice
+            handlers.append(_RootForwarder())
+            logger.propagate = False
+        queue_handler = QueueHandler(Queue(-1))
+        _queued_loggers[logger_name] = [queue_handler, handlers, None]
+        _start_listener(logger_name)
+        logger.addHandler(queue_handler)
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
 
     return logger
 
+
+def _start_listener(logger_name):
+    """Start the background writer of a queued logger."""
+    entry = _queued_loggers[logger_name]
+    queue_handler, handlers, _ = entry
+    entry[2] = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    entry[2].start()
+
+
+def _stop_listeners():
+    """Stop every listener once its queue is drained, then flush the real handlers."""
+    for entry in _queued_loggers.values():
+        if entry[2] is not None:
+            entry[2].stop()
+            entry[2] = None
+        for handler in entry[1]:
+            handler.flush()
+
+
+def flush_logging():
+    """
+    Write out every queued record before returning, e.g. at the end of an Airflow task
+    (whose process may exit without running atexit hooks). Listeners keep running.
+    """
+    _stop_listeners()
+    for logger_name in _queued_loggers:
+        _start_listener(logger_name)
+
+
+def _restart_listeners_after_fork():
+    """Threads do not survive fork: give the child fresh queues and listeners."""
+    for logger_name, entry in _queued_loggers.items():
+        entry[0].queue = Queue(-1)
+        _start_listener(logger_name)
+
+
+atexit.register(_stop_listeners)
+os.register_at_fork(after_in_child=_restart_listeners_after_fork)
@@ -0,0 +1 @@
+# Puts transform_dags/ on sys.path for pytest, matching the DAG folder imports (config.*, utils.*)
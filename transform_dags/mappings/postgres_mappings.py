@@ -1,158 +1,237 @@
 from datetime import datetime
+import hashlib
+import threading
+from collections import namedtuple
+from contextlib import nullcontext
+from functools import partial
 from utils.data_cleaning import clean_string, parse_date, parse_decimal, parse_int,normalize_interest_frequency,parse_bool,parse_coupon_rate
+from utils.postgres_utils import build_upsert_sql, bulk_upsert, bulk_insert_ignore, fetch_existing_links
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+
+# ---------------- FIELD SPECIFICATION ----------------
+# One FieldSpec per column: (pg_column, mongo_field, parser, pg_type). Each table's
+# spec is compiled once at import into a row mapper, the Mongo projection and the
+# upsert SQL, so no stage rebuilds them per ISIN. Every upsert returns whether the
+# row was inserted (xmax = 0) or updated; rows skipped as unchanged return nothing.
+FieldSpec = namedtuple("FieldSpec", "pg_column mongo_field parser pg_type")
+
+
+def coupon_rate_value(value):
+    """Numeric part of parse_coupon_rate (the category is not stored)."""
+    return parse_coupon_rate(value)[0]
+
+
+def strict_bool(value):
+    """Pass real booleans through, anything else becomes None."""
+    return value if isinstance(value, bool) else None
+
+
+def string_list(value):
+    """Wrap a single cleaned string in a list for TEXT[] columns."""
+    return [clean_string(value)] if value else []
+
+
+class TableSpec:
+    """Compiled field specification of one Postgres table and its source collection."""
+
+    def __init__(self, table, collection, fields, conflict_column="isin_code", returning=()):
+        self.table = table
+        self.collection = collection
+        self.fields = tuple(fields)
+        self.conflict_column = conflict_column
+        self.columns = tuple(field.pg_column for field in self.fields) + ("data_hash",)
+        self.projection = {"_id": 0, "ISIN_CODE": 1, **{field.mongo_field: 1 for field in self.fields}}
+        self.returning = tuple(returning) + ("(xmax = 0)",)
+        self.upsert_sql = build_upsert_sql(table, self.columns, conflict_column)
+        self.upsert_sql += f" RETURNING {', '.join(self.returning)}"
+        self.map_row = self._compile()
+
+    def _compile(self):
+        """Build the row mapper: Mongo document → value tuple in field order (without data_hash)."""
+        getters = tuple(
+            # parse_decimal takes the source field name for its warning message
+            (field.mongo_field, partial(parse_decimal, field.mongo_field) if field.parser is parse_decimal else field.parser)
+            for field in self.fields
+        )
+
+        def map_row(data):
+            get = data.get
+            return tuple([parser(get(mongo_field)) for mongo_field, parser in getters])
+
+        map_row.__doc__ = f"Map a MongoDB {self.collection} document to a {self.table} row tuple."
+        return map_row
+
+    def as_dict(self, data):
+        """Map a MongoDB document to a {pg_column: value} dict for this table, fingerprinted like map_row rows."""
+        values = self.map_row(data)
+        row = dict(zip(self.columns, values))
+        row["data_hash"] = compute_row_hash(values)
+        row["last_updated"] = datetime.now()
+        return row
 
 
 # ---------------- ISIN BASIC INFO ----------------
+ISIN_BASIC_INFO_SPEC = TableSpec("isin_basic_info", "isin_basic_info", [
+    FieldSpec("isin_code", "ISIN_CODE", clean_string, "VARCHAR(12)"),
+    FieldSpec("security_type", "SECURITY_TYPE", clean_string, "VARCHAR(100)"),
+    FieldSpec("isin_description", "ISIN_DESCRIPTION", clean_string, "TEXT"),
+    FieldSpec("issue_description", "ISSUE_DESCRIPTION", clean_string, "TEXT"),
+    FieldSpec("former_name", "FORMER_NAME", clean_string, "VARCHAR(255)"),
+    FieldSpec("coupon_rate_percent", "COUPON_RATE_PERCENT", coupon_rate_value, "DECIMAL(6,3)"),
+    FieldSpec("maturity_date", "MATURITY_DATE", parse_date, "DATE"),
+    FieldSpec("ytm_percent", "YTM_PERCENT", parse_decimal, "DECIMAL(6,3)"),
+    FieldSpec("tenure_years", "TENURE_YEARS", parse_int, "INTEGER"),
+    FieldSpec("tenure_months", "TENURE_MONTHS", parse_int, "INTEGER"),
+    FieldSpec("tenure_days", "TENURE_DAYS", parse_int, "INTEGER"),
+    FieldSpec("minimum_investment_rs", "MINIMUM_INVESTMENT_RS", parse_decimal, "DECIMAL(18,2)"),
+    FieldSpec("interest_payment_frequency_raw", "INTEREST_PAYMENT_FREQUENCY", clean_string, "TEXT"),
+    FieldSpec("interest_payment_frequency", "INTEREST_PAYMENT_FREQUENCY", normalize_interest_frequency, "VARCHAR(50)"),
+    FieldSpec("face_value_rs", "FACE_VALUE_RS", parse_decimal, "DECIMAL(18,2)"),
+    FieldSpec("percentage_sold", "PERCENTAGE_SOLD", parse_decimal, "DECIMAL(6,3)"),
+    FieldSpec("isin_status", "ISIN_STATUS", clean_string, "VARCHAR(50)"),
+    FieldSpec("issue_size_lakhs", "ISSUE_SIZE_LAKHS", parse_decimal, "DECIMAL(18,2)"),
+    FieldSpec("issue_date", "ISSUE_DATE", parse_date, "DATE"),
+    FieldSpec("first_interest_payment_date", "FIRST_INTEREST_PAYMENT_DATE", parse_date, "DATE"),
+    FieldSpec("mode_of_issuance", "MODE_OF_ISSUANCE", clean_string, "VARCHAR(100)"),
+    FieldSpec("closing_date", "CLOSING_DATE", parse_date, "DATE"),
+    FieldSpec("series", "SERIES", clean_string, "VARCHAR(100)"),
+    FieldSpec("paid_up_value_rs", "PAID_UP_VALUE_RS", parse_decimal, "DECIMAL(18,2)"),
+    # Handle arrays for ratings
+    FieldSpec("credit_ratings", "CREDIT_RATING", string_list, "TEXT[]"),
+    FieldSpec("rating_agencies", "RATING_AGENCY", string_list, "TEXT[]"),
+])
+
+# ---------------- ISIN DETAILED INFO ----------------
+ISIN_DETAILED_INFO_SPEC = TableSpec("isin_detailed_info", "isin_detailed_info", [
+    FieldSpec("isin_code", "ISIN_CODE", clean_string, "VARCHAR(12)"),
+    FieldSpec("listing_date", "LISTING_DATE", parse_date, "DATE"),
+    FieldSpec("allotment_date", "ALLOTMENT_DATE", parse_date, "DATE"),
+    FieldSpec("coupon_type", "COUPON_TYPE", clean_string, "VARCHAR(100)"),
+    FieldSpec("day_count_convention", "DAY_COUNT_CONVENTION", clean_string, "VARCHAR(100)"),
+    FieldSpec("security_collateral", "SECURITY_COLLATERAL", clean_string, "TEXT"),
+    FieldSpec("tax_category", "TAX_CATEGORY", clean_string, "VARCHAR(50)"),
+    FieldSpec("call_option_date", "CALL_OPTION_DATE", parse_date, "DATE"),
+    FieldSpec("put_option_date", "PUT_OPTION_DATE", parse_date, "DATE"),
+    FieldSpec("primary_exchange", "PRIMARY_EXCHANGE", clean_string, "VARCHAR(50)"),
+    FieldSpec("secondary_exchange", "SECONDARY_EXCHANGE", clean_string, "VARCHAR(50)"),
+    FieldSpec("listed_unlisted", "LISTED_UNLISTED", clean_string, "VARCHAR(50)"),
+    FieldSpec("listing_exchanges", "LISTING_EXCHANGES", clean_string, "VARCHAR(255)"),
+    FieldSpec("trading_status", "TRADING_STATUS", clean_string, "VARCHAR(100)"),
+    FieldSpec("market_lot", "MARKET_LOT", parse_int, "BIGINT"),
+    FieldSpec("settlement_cycle", "SETTLEMENT_CYCLE", clean_string, "VARCHAR(100)"),
+    FieldSpec("last_traded_price_rs", "LAST_TRADED_PRICE_RS", parse_decimal, "DECIMAL(18,4)"),
+    FieldSpec("last_traded_date", "LAST_TRADED_DATE", parse_date, "DATE"),
+    FieldSpec("volume_traded", "VOLUME_TRADED", parse_int, "BIGINT"),
+    FieldSpec("value_traded_lakhs", "VALUE_TRADED_LAKHS", parse_decimal, "DECIMAL(18,4)"),
+    FieldSpec("number_of_trades", "NUMBER_OF_TRADES", parse_int, "BIGINT"),
+    FieldSpec("weighted_avg_price_rs", "WEIGHTED_AVG_PRICE_RS", parse_decimal, "DECIMAL(18,4)"),
+    FieldSpec("weighted_avg_yield_percent", "WEIGHTED_AVG_YIELD_PERCENT", parse_decimal, "DECIMAL(6,3)"),
+    FieldSpec("current_yield_percent", "CURRENT_YIELD_PERCENT", parse_decimal, "DECIMAL(6,3)"),
+    FieldSpec("duration_years", "DURATION_YEARS", parse_decimal, "DECIMAL(8,4)"),
+    FieldSpec("convexity", "CONVEXITY", parse_decimal, "DECIMAL(20,8)"),
+    FieldSpec("demat_requests_pending", "DEMAT_REQUESTS_PENDING", parse_int, "BIGINT"),
+    FieldSpec("services_stopped", "SERVICES_STOPPED", strict_bool, "BOOLEAN"),
+    FieldSpec("no_of_bonds_ncd", "NO_OF_BONDS_NCD", parse_int, "BIGINT"),
+    FieldSpec("benefit_under_section", "BENEFIT_UNDER_SECTION", clean_string, "VARCHAR(255)"),
+    FieldSpec("basel_compliant", "BASEL_COMPLIANT", strict_bool, "BOOLEAN"),
+    FieldSpec("lock_in_period", "LOCK_IN_PERIOD", clean_string, "VARCHAR(100)"),
+    FieldSpec("use_of_proceeds", "USE_OF_PROCEEDS", clean_string, "TEXT"),
+    FieldSpec("seniority", "SENIORITY", clean_string, "VARCHAR(255)"),
+    FieldSpec("redemption", "REDEMPTION", clean_string, "TEXT"),
+    FieldSpec("opening_date", "OPENING_DATE", parse_date, "DATE"),
+    FieldSpec("bse_date_of_listing", "BSE_DATE_OF_LISTING", parse_date, "DATE"),
+    FieldSpec("pricing_method", "PRICING_METHOD", clean_string, "TEXT"),
+    FieldSpec("due_for_maturity", "DUE_FOR_MATURITY", parse_int, "INT"),
+    FieldSpec("compounding_frequency", "COMPOUNDING_FREQUENCY", clean_string, "VARCHAR(100)"),
+    FieldSpec("interest_payment_dates", "INTEREST_PAYMENT_DATES", clean_string, "TEXT"),
+    FieldSpec("interest_payment_day_convention", "INTEREST_PAYMENT_DAY_CONVENTION", clean_string, "VARCHAR(100)"),
+    FieldSpec("payment_schedule", "PAYMENT_SCHEDULE", clean_string, "TEXT"),
+    FieldSpec("redemption_premium", "REDEMPTION_PREMIUM", clean_string, "VARCHAR(255)"),
+    FieldSpec("call_option", "CALL_OPTION", parse_bool, "BOOLEAN"),
+    FieldSpec("call_notification_period", "CALL_NOTIFICATION_PERIOD", clean_string, "VARCHAR(255)"),
+    FieldSpec("put_option", "PUT_OPTION", parse_bool, "BOOLEAN"),
+    FieldSpec("put_notification_period", "PUT_NOTIFICATION_PERIOD", clean_string, "VARCHAR(255)"),
+    FieldSpec("buyback_option", "BUYBACK_OPTION", clean_string, "VARCHAR(100)"),
+    FieldSpec("secured", "SECURED", parse_bool, "BOOLEAN"),
+    FieldSpec("liquidation_status", "LIQUIDATION_STATUS", clean_string, "VARCHAR(255)"),
+    FieldSpec("record_date_day_convention", "RECORD_DATE_DAY_CONVENTION", clean_string, "VARCHAR(255)"),
+    FieldSpec("redemption_payment_day_convention", "REDEMPTION_PAYMENT_DAY_CONVENTION", clean_string, "VARCHAR(255)"),
+    FieldSpec("reset_details", "RESET_DETAILS", clean_string, "TEXT"),
+    FieldSpec("transferable", "TRANSFERABLE", parse_bool, "BOOLEAN"),
+    FieldSpec("greenshoe_option", "GREENSHOE_OPTION", parse_bool, "BOOLEAN"),
+    FieldSpec("oversubscription_multiple", "OVERSUBSCRIPTION_MULTIPLE", parse_decimal, "DECIMAL(18,6)"),
+    FieldSpec("percentage_sold_cumulative", "PERCENTAGE_SOLD_CUMULATIVE", parse_decimal, "DECIMAL(6,3)"),
+    FieldSpec("bse_scrip_code", "BSE_SCRIP_CODE", clean_string, "VARCHAR(50)"),
+    FieldSpec("nse_symbol", "NSE_SYMBOL", clean_string, "VARCHAR(50)"),
+    FieldSpec("nse_date_of_listing", "NSE_DATE_OF_LISTING", parse_date, "DATE"),
+])
+
+# ---------------- COMPANY INFO ----------------
+COMPANY_INFO_SPEC = TableSpec("company_info", "isin_company_info", [
+    FieldSpec("issuer_name", "ISSUER_NAME", clean_string, "VARCHAR(255)"),
+    FieldSpec("issuer_address", "ISSUER_ADDRESS", clean_string, "TEXT"),
+    FieldSpec("issuer_type", "ISSUER_TYPE", clean_string, "VARCHAR(50)"),
+    FieldSpec("issuer_state", "ISSUER_STATE", clean_string, "VARCHAR(100)"),
+    FieldSpec("issuer_website", "ISSUER_WEBSITE", clean_string, "VARCHAR(255)"),
+    FieldSpec("contact_person", "CONTACT_PERSON", clean_string, "VARCHAR(100)"),
+    FieldSpec("phone_number", "PHONE_NUMBER", clean_string, "VARCHAR(255)"),
+    FieldSpec("fax_number", "FAX_NUMBER", clean_string, "VARCHAR(50)"),
+    FieldSpec("email_id", "EMAIL_ID", clean_string, "TEXT"),
+    FieldSpec("guaranteed_by", "GUARANTEED_BY", clean_string, "TEXT"),
+    FieldSpec("registrar", "REGISTRAR", clean_string, "VARCHAR(255)"),
+    FieldSpec("industry_group", "INDUSTRY_GROUP", clean_string, "VARCHAR(100)"),
+    FieldSpec("macro_sector", "MACRO_SECTOR", clean_string, "VARCHAR(100)"),
+    FieldSpec("micro_industry", "MICRO_INDUSTRY", clean_string, "VARCHAR(100)"),
+    FieldSpec("product_service_activity", "PRODUCT_SERVICE_ACTIVITY", clean_string, "TEXT"),
+    FieldSpec("sector", "SECTOR", clean_string, "VARCHAR(100)"),
+    FieldSpec("security_code", "SECURITY_CODE", clean_string, "VARCHAR(50)"),
+], conflict_column="issuer_name", returning=("issuer_name", "company_id"))
+
+# ---------------- RTA INFO ----------------
+RTA_INFO_SPEC = TableSpec("rta_info", "isin_rta_info", [
+    FieldSpec("rta_name", "RTA_NAME", clean_string, "VARCHAR(255)"),
+    FieldSpec("rta_bp_id", "RTA_BP_ID", clean_string, "VARCHAR(50)"),
+    FieldSpec("rta_address", "RTA_ADDRESS", clean_string, "TEXT"),
+    FieldSpec("rta_contact_person", "RTA_CONTACT_PERSON", clean_string, "VARCHAR(100)"),
+    FieldSpec("rta_phone", "RTA_PHONE", clean_string, "VARCHAR(255)"),
+    FieldSpec("rta_fax", "RTA_FAX", clean_string, "VARCHAR(50)"),
+    FieldSpec("rta_email", "RTA_EMAIL", clean_string, "TEXT"),
+    FieldSpec("arrangers", "ARRANGERS", clean_string, "TEXT"),
+    FieldSpec("trustee", "TRUSTEE", clean_string, "VARCHAR(255)"),
+    FieldSpec("im_term_sheet", "IM_TERM_SHEET", clean_string, "VARCHAR(500)"),
+], conflict_column="rta_name", returning=("rta_name", "rta_id"))
+
+TABLE_SPECS = {
+    spec.table: spec
+    for spec in (ISIN_BASIC_INFO_SPEC, ISIN_DETAILED_INFO_SPEC, COMPANY_INFO_SPEC, RTA_INFO_SPEC)
+}
+
+# Fields each source collection has to return for the mappers
+MONGO_PROJECTIONS = {spec.collection: spec.projection for spec in TABLE_SPECS.values()}
+
+
 def map_postgres_isin_basic_info(data):
     """Map MongoDB data to PostgreSQL isin_basic_info table."""
-    return {
-        # "_table": "isin_basic_info",
-        "isin_code": clean_string(data.get("ISIN_CODE")),
-        "security_type": clean_string(data.get("SECURITY_TYPE")),
-        "isin_description": clean_string(data.get("ISIN_DESCRIPTION")),
-        "issue_description": clean_string(data.get("ISSUE_DESCRIPTION")),
-        "former_name": clean_string(data.get("FORMER_NAME")),
-        "coupon_rate_percent": parse_coupon_rate(data.get("COUPON_RATE_PERCENT"))[0],
-        "maturity_date": parse_date(data.get("MATURITY_DATE")),
-        "ytm_percent": parse_decimal("YTM_PERCENT",data.get("YTM_PERCENT")),
-        "tenure_years": parse_int(data.get("TENURE_YEARS")),
-        "tenure_months": parse_int(data.get("TENURE_MONTHS")),
-        "tenure_days": parse_int(data.get("TENURE_DAYS")),
-        "minimum_investment_rs": parse_decimal("MINIMUM_INVESTMENT_RS",data.get("MINIMUM_INVESTMENT_RS")),
-        "interest_payment_frequency_raw": clean_string(data.get("INTEREST_PAYMENT_FREQUENCY")),
-        "interest_payment_frequency": normalize_interest_frequency(data.get("INTEREST_PAYMENT_FREQUENCY")),
-        "face_value_rs": parse_decimal("FACE_VALUE_RS",data.get("FACE_VALUE_RS")),
-        "percentage_sold": parse_decimal("PERCENTAGE_SOLD",data.get("PERCENTAGE_SOLD")),
-        "isin_status": clean_string(data.get("ISIN_STATUS")),
-        "issue_size_lakhs": parse_decimal("ISSUE_SIZE_LAKHS",data.get("ISSUE_SIZE_LAKHS")),
-        "issue_date": parse_date(data.get("ISSUE_DATE")),
-        "first_interest_payment_date": parse_date(data.get("FIRST_INTEREST_PAYMENT_DATE")),
-        "mode_of_issuance": clean_string(data.get("MODE_OF_ISSUANCE")),
-        "closing_date": parse_date(data.get("CLOSING_DATE")),
-        "series": clean_string(data.get("SERIES")),
-        "paid_up_value_rs": parse_decimal("PAID_UP_VALUE_RS",data.get("PAID_UP_VALUE_RS")),
-        # Handle arrays for ratings
-        "credit_ratings": [clean_string(data.get("CREDIT_RATING"))] if data.get("CREDIT_RATING") else [],
-        "rating_agencies": [clean_string(data.get("RATING_AGENCY"))] if data.get("RATING_AGENCY") else [],
-        "data_hash": clean_string(data.get("DATA_HASH")),
-        "last_updated": datetime.now()
-    }
+    return ISIN_BASIC_INFO_SPEC.as_dict(data)
+
 
-# ---------------- ISIN DETAILED INFO ----------------
 def map_postgres_isin_detailed_info(data):
     """Map MongoDB data to PostgreSQL isin_detailed_info table."""
-    return {
-        # "_table": "isin_detailed_info",
-        "isin_code": clean_string(data.get("ISIN_CODE")),
-        "listing_date": parse_date(data.get("LISTING_DATE")),
-        "allotment_date": parse_date(data.get("ALLOTMENT_DATE")),
-        "coupon_type": clean_string(data.get("COUPON_TYPE")),
-        "day_count_convention": clean_string(data.get("DAY_COUNT_CONVENTION")),
-        "security_collateral": clean_string(data.get("SECURITY_COLLATERAL")),
-        "tax_category": clean_string(data.get("TAX_CATEGORY")),
-        "call_option_date": parse_date(data.get("CALL_OPTION_DATE")),
-        "put_option_date": parse_date(data.get("PUT_OPTION_DATE")),
-        "primary_exchange": clean_string(data.get("PRIMARY_EXCHANGE")),
-        "secondary_exchange": clean_string(data.get("SECONDARY_EXCHANGE")),
-        "listed_unlisted": clean_string(data.get("LISTED_UNLISTED")),
-        "listing_exchanges": clean_string(data.get("LISTING_EXCHANGES")),
-        "trading_status": clean_string(data.get("TRADING_STATUS")),
-        "market_lot": parse_int(data.get("MARKET_LOT")),
-        "settlement_cycle": clean_string(data.get("SETTLEMENT_CYCLE")),
-        "last_traded_price_rs": parse_decimal("LAST_TRADED_PRICE_RS",data.get("LAST_TRADED_PRICE_RS")),
-        "last_traded_date": parse_date(data.get("LAST_TRADED_DATE")),
-        "volume_traded": parse_int(data.get("VOLUME_TRADED")),
-        "value_traded_lakhs": parse_decimal("VALUE_TRADED_LAKHS",data.get("VALUE_TRADED_LAKHS")),
-        "number_of_trades": parse_int(data.get("NUMBER_OF_TRADES")),
-        "weighted_avg_price_rs": parse_decimal("WEIGHTED_AVG_PRICE_RS",data.get("WEIGHTED_AVG_PRICE_RS")),
-        "weighted_avg_yield_percent": parse_decimal('WEIGHTED_AVG_YIELD_PERCENT',data.get("WEIGHTED_AVG_YIELD_PERCENT")),
-        "current_yield_percent": parse_decimal('CURRENT_YIELD_PERCENT',data.get("CURRENT_YIELD_PERCENT")),
-        "duration_years": parse_decimal('DURATION_YEARS',data.get("DURATION_YEARS")),
-        "convexity": parse_decimal('CONVEXITY',data.get("CONVEXITY")),
-        "demat_requests_pending": parse_int(data.get("DEMAT_REQUESTS_PENDING")),
-        "services_stopped": data.get("SERVICES_STOPPED") if isinstance(data.get("SERVICES_STOPPED"), bool) else None,
-        "no_of_bonds_ncd": parse_int(data.get("NO_OF_BONDS_NCD")),
-        "benefit_under_section": clean_string(data.get("BENEFIT_UNDER_SECTION")),
-        "basel_compliant": data.get("BASEL_COMPLIANT") if isinstance(data.get("BASEL_COMPLIANT"), bool) else None,
-        "lock_in_period": clean_string(data.get("LOCK_IN_PERIOD")),
-        "use_of_proceeds": clean_string(data.get("USE_OF_PROCEEDS")),
-        "seniority": clean_string(data.get("SENIORITY")),
-        "redemption": clean_string(data.get("REDEMPTION")),
-        "opening_date": parse_date(data.get("OPENING_DATE")),
-        "bse_date_of_listing": parse_date(data.get("BSE_DATE_OF_LISTING")),
-        "pricing_method": clean_string(data.get("PRICING_METHOD")),
-        "due_for_maturity": parse_int(data.get("DUE_FOR_MATURITY")),
-        "compounding_frequency": clean_string(data.get("COMPOUNDING_FREQUENCY")),
-        "interest_payment_dates": clean_string(data.get("INTEREST_PAYMENT_DATES")),
-        "interest_payment_day_convention": clean_string(data.get("INTEREST_PAYMENT_DAY_CONVENTION")),
-        "payment_schedule": clean_string(data.get("PAYMENT_SCHEDULE")),
-        "redemption_premium": clean_string(data.get("REDEMPTION_PREMIUM")),
-        "call_option":parse_bool(data.get("CALL_OPTION")),
-        "call_notification_period": clean_string(data.get("CALL_NOTIFICATION_PERIOD")),
-        "put_option": parse_bool(data.get("PUT_OPTION")),
-        "put_notification_period": clean_string(data.get("PUT_NOTIFICATION_PERIOD")),
-        "buyback_option": clean_string(data.get("BUYBACK_OPTION")),
-        "secured": parse_bool(data.get("SECURED")),
-        "liquidation_status": clean_string(data.get("LIQUIDATION_STATUS")),
-        "record_date_day_convention": clean_string(data.get("RECORD_DATE_DAY_CONVENTION")),
-        "redemption_payment_day_convention": clean_string(data.get("REDEMPTION_PAYMENT_DAY_CONVENTION")),
-        "reset_details": clean_string(data.get("RESET_DETAILS")),
-        "transferable": parse_bool(data.get("TRANSFERABLE")),
-        "greenshoe_option": parse_bool(data.get("GREENSHOE_OPTION")),
-        "oversubscription_multiple": parse_decimal('OVERSUBSCRIPTION_MULTIPLE',data.get("OVERSUBSCRIPTION_MULTIPLE")),
-        "percentage_sold_cumulative": parse_decimal('PERCENTAGE_SOLD_CUMULATIVE',data.get("PERCENTAGE_SOLD_CUMULATIVE")),
-        "bse_scrip_code": clean_string(data.get("BSE_SCRIP_CODE")),
-        "nse_symbol": clean_string(data.get("NSE_SYMBOL")),
-        "nse_date_of_listing": parse_date(data.get("NSE_DATE_OF_LISTING")),
-        "data_hash": clean_string(data.get("DATA_HASH")),
-        "last_updated": datetime.now()
-    }
+    return ISIN_DETAILED_INFO_SPEC.as_dict(data)
 
 
-# ---------------- COMPANY INFO ----------------
 def map_postgres_company_info(data):
     """Map MongoDB data to PostgreSQL company_info table."""
-    return {
-        # "_table": "company_info",
-        "issuer_name": clean_string(data.get("ISSUER_NAME")),
-        "issuer_address": clean_string(data.get("ISSUER_ADDRESS")),
-        "issuer_type": clean_string(data.get("ISSUER_TYPE")),
-        "issuer_state": clean_string(data.get("ISSUER_STATE")),
-        "issuer_website": clean_string(data.get("ISSUER_WEBSITE")),
-        "contact_person": clean_string(data.get("CONTACT_PERSON")),
-        "phone_number": clean_string(data.get("PHONE_NUMBER")),
-        "fax_number": clean_string(data.get("FAX_NUMBER")),
-        "email_id": clean_string(data.get("EMAIL_ID")),
-        "guaranteed_by": clean_string(data.get("GUARANTEED_BY")),
-        "registrar": clean_string(data.get("REGISTRAR")),
-        "industry_group": clean_string(data.get("INDUSTRY_GROUP")),
-        "macro_sector": clean_string(data.get("MACRO_SECTOR")),
-        "micro_industry": clean_string(data.get("MICRO_INDUSTRY")),
-        "product_service_activity": clean_string(data.get("PRODUCT_SERVICE_ACTIVITY")),
-        "sector": clean_string(data.get("SECTOR")),
-        "security_code": clean_string(data.get("SECURITY_CODE")),
-        "data_hash": clean_string(data.get("DATA_HASH")),
-        "last_updated": datetime.now()
-    }
+    return COMPANY_INFO_SPEC.as_dict(data)
+
 
-# ---------------- RTA INFO ----------------
 def map_postgres_rta_info(data):
     """Map MongoDB data to PostgreSQL rta_info table."""
-    return {
-        # "_table": "rta_info",
-        "rta_name": clean_string(data.get("RTA_NAME")),
-        "rta_bp_id": clean_string(data.get("RTA_BP_ID")),
-        "rta_address": clean_string(data.get("RTA_ADDRESS")),
-        "rta_contact_person": clean_string(data.get("RTA_CONTACT_PERSON")),
-        "rta_phone": clean_string(data.get("RTA_PHONE")),
-        "rta_fax": clean_string(data.get("RTA_FAX")),
-        "rta_email": clean_string(data.get("RTA_EMAIL")),
-        "arrangers": clean_string(data.get("ARRANGERS")),
-        "trustee": clean_string(data.get("TRUSTEE")),
-        "im_term_sheet": clean_string(data.get("IM_TERM_SHEET")),
-        "data_hash": clean_string(data.get("DATA_HASH")),
-        "last_updated": datetime.now()
-    }
+    return RTA_INFO_SPEC.as_dict(data)
+
 
 # ---------------- MAPPING TABLES ----------------
 def map_postgres_isin_company_map(isin_code, company_id):
@@ -178,85 +257,169 @@ def map_postgres_isin_rta_map(isin_code, rta_id, effective_from=None, effective_
 
 
 
+class TableBatch(namedtuple("TableBatch", "columns rows isins")):
+    """Column-ordered rows of one table for a batch; rows[i] was mapped from ISIN isins[i]."""
+
+    def select(self, isin):
+        """Return the sub-batch holding only the rows of one ISIN."""
+        pairs = [(row, row_isin) for row, row_isin in zip(self.rows, self.isins) if row_isin == isin]
+        return TableBatch(self.columns, [row for row, _ in pairs], [row_isin for _, row_isin in pairs])
+
+
+def compute_row_hash(values):
+    """
+    Deterministic SHA-256 fingerprint of a mapped row tuple. Row tuples never hold
+    volatile columns (last_updated is set by Postgres), so the hash only changes
+    when the content does.
+    """
+    return hashlib.sha256(repr(values).encode()).hexdigest()
+
+
 def map_to_postgres(data):
+    """Map a {collection: doc} bundle to per-table rows, each stamped with its content fingerprint."""
+    return {table: spec.as_dict(data.get(spec.collection, {})) for table, spec in TABLE_SPECS.items()}
+
+
+def map_batch_to_postgres(bundles, run_stats=None):
+    """
+    Map a batch of (isin, {collection: doc}) bundles straight to {table: TableBatch}:
+    tuples in the table's column order with data_hash appended, ready for a bulk
+    writer. Returns (mapped, failed) where failed is {isin: exception}.
+    Mapping and hashing are timed as separate stages of `run_stats` when given.
+    """
+    timer = run_stats.timer if run_stats else nullcontext
+    rows = {table: [] for table in TABLE_SPECS}
+    isins = {table: [] for table in TABLE_SPECS}
+    failed = {}
+    with timer("map"):
+        for isin, data in bundles:
+            try:
+                mapped = []
+                for table, spec in TABLE_SPECS.items():
+                    doc = data.get(spec.collection)
+                    if doc:
+                        mapped.append((table, spec.map_row(doc)))
+            except Exception as e:
+                failed[isin] = e
+                continue
+            for table, values in mapped:
+                rows[table].append(values)
+                isins[table].append(isin)
+
+    with timer("hash"):
+        for table_rows in rows.values():
+            table_rows[:] = [values + (compute_row_hash(values),) for values in table_rows]
+
     return {
-        "isin_basic_info": map_postgres_isin_basic_info(data.get("isin_basic_info", {})),
-        "isin_detailed_info": map_postgres_isin_detailed_info(data.get("isin_detailed_info", {})),
-        "company_info": map_postgres_company_info(data.get("company_info", {})),
-        "rta_info": map_postgres_rta_info(data.get("rta_info", {}))
-    }
+        table: TableBatch(spec.columns, rows[table], isins[table])
+        for table, spec in TABLE_SPECS.items()
+    }, failed
 
 
+class DimensionCache:
+    """
+    Run-scoped cache of a dimension table (company_info / rta_info):
+    natural key → (surrogate id, data_hash). Preloaded in one query, so each batch
+    only writes the dimension rows that are new or whose fingerprint changed.
+    Shared by all worker threads.
+    """
 
-def upsert_company_and_map(cur, isin_code, company_data):
-    """Upsert into company_info and link with isin_company_map."""
-    issuer_name = company_data.get("issuer_name")
-    if not issuer_name:
-        return
-
-    # 1. Try to find existing company
-    cur.execute("SELECT company_id FROM company_info WHERE issuer_name = %s", (issuer_name,))
-    row = cur.fetchone()
-
-    if row:
-        company_id = row[0]
-        # Optionally update existing fields
-        update_str = ", ".join([f"{col} = %s" for col in company_data.keys() if col != "issuer_name"])
-        if update_str:
-            values = [company_data[col] for col in company_data.keys() if col != "issuer_name"]
-            values.append(issuer_name)
-            cur.execute(f"UPDATE company_info SET {update_str}, last_updated = NOW() WHERE issuer_name = %s", values)
-    else:
-        # 2. Insert new company
-        columns = list(company_data.keys())
-        values = [company_data[col] for col in columns]
-        placeholders = ", ".join(["%s"] * len(columns))
-        columns_str = ", ".join(columns)
-        cur.execute(
-            f"INSERT INTO company_info ({columns_str}) VALUES ({placeholders}) RETURNING company_id",
-            values
-        )
-        company_id = cur.fetchone()[0]
-
-    # 3. Ensure mapping exists
-    cur.execute(
-        "INSERT INTO isin_company_map (isin_code, company_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
-        (isin_code, company_id)
-    )
-
-
-def upsert_rta_and_map(cur, isin_code, rta_data):
-    """Upsert into rta_info and link with isin_rta_map."""
-    rta_name = rta_data.get("rta_name")
-    if not rta_name:
-        return
-
-    # 1. Try to find existing RTA
-    cur.execute("SELECT rta_id FROM rta_info WHERE rta_name = %s", (rta_name,))
-    row = cur.fetchone()
-
-    if row:
-        rta_id = row[0]
-        # Update existing fields if needed
-        update_str = ", ".join([f"{col} = %s" for col in rta_data.keys() if col != "rta_name"])
-        if update_str:
-            values = [rta_data[col] for col in rta_data.keys() if col != "rta_name"]
-            values.append(rta_name)
-            cur.execute(f"UPDATE rta_info SET {update_str}, last_updated = NOW() WHERE rta_name = %s", values)
-    else:
-        # 2. Insert new RTA
-        columns = list(rta_data.keys())
-        values = [rta_data[col] for col in columns]
-        placeholders = ", ".join(["%s"] * len(columns))
-        columns_str = ", ".join(columns)
-        cur.execute(
-            f"INSERT INTO rta_info ({columns_str}) VALUES ({placeholders}) RETURNING rta_id",
-            values
-        )
-        rta_id = cur.fetchone()[0]
+    def __init__(self, spec, id_column, map_table):
+        self.spec = spec
+        self.table = spec.table
+        self.key_column = spec.conflict_column
+        self.id_column = id_column
+        self.map_table = map_table
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def preload(self, cur):
+        """Load every existing key, id and fingerprint of the table in one query."""
+        cur.execute(f"SELECT {self.key_column}, {self.id_column}, data_hash FROM {self.table}")
+        entries = {key: (row_id, data_hash) for key, row_id, data_hash in cur.fetchall()}
+        with self._lock:
+            self._entries = entries
+        return len(entries)
+
+    def sync(self, cur, batch, counts):
+        """
+        Bulk upsert the rows of a TableBatch that are new or changed and return
+        {key: (id, data_hash)} for every key in it. Inserted/updated/skipped row
+        counts are added to `counts`. The cache itself is only updated through
+        update(), once the caller's transaction has committed.
+        """
+        key_index = batch.columns.index(self.key_column)
+        latest = {row[key_index]: row for row in batch.rows if row[key_index]}
+        with self._lock:
+            known = {key: self._entries.get(key) for key in latest}
+        resolved = {
+            key: entry for key, entry in known.items()
+            if entry is not None and entry[1] == latest[key][-1]
+        }
+
+        # Sorted so concurrent batches lock the same dimension rows in the same order
+        changed = [latest[key] for key in sorted(latest) if key not in resolved]
+        counts[f"{self.table} skipped"] += len(resolved)
+        if changed:
+            ids = {}
+            for key, row_id, inserted in bulk_upsert(
+                cur, self.table, batch.columns, changed,
+                returning=self.spec.returning,
+                sql=self.spec.upsert_sql
+            ):
+                ids[key] = row_id
+                counts[f"{self.table} {'inserted' if inserted else 'updated'}"] += 1
+            # Rows already up to date in Postgres (e.g. written by another shard) return nothing
+            missing = [row[key_index] for row in changed if row[key_index] not in ids]
+            counts[f"{self.table} skipped"] += len(missing)
+            if missing:
+                cur.execute(
+                    f"SELECT {self.key_column}, {self.id_column} FROM {self.table} WHERE {self.key_column} = ANY(%s)",
+                    (missing,)
+                )
+                ids.update(cur.fetchall())
+            for row in changed:
+                resolved[row[key_index]] = (ids[row[key_index]], row[-1])
+        return resolved
+
+    def update(self, entries):
+        """Record committed {key: (id, data_hash)} entries."""
+        with self._lock:
+            self._entries.update(entries)
+
+
+DIMENSION_CACHES = {
+    "company_info": DimensionCache(COMPANY_INFO_SPEC, "company_id", "isin_company_map"),
+    "rta_info": DimensionCache(RTA_INFO_SPEC, "rta_id", "isin_rta_map"),
+}
+
+
+def preload_dimension_caches(cur):
+    """Preload every dimension cache at the start of a run."""
+    for table, cache in DIMENSION_CACHES.items():
+        count = cache.preload(cur)
+        logger.info(f"Preloaded {count} {table} rows into the dimension cache")
+
+
+def upsert_dimensions_and_map(cur, table, batch, counts):
+    """
+    Write the dimension rows of a TableBatch for `table` and bulk-link each ISIN to
+    its dimension id, adding row counts of both tables to `counts`. Returns the
+    resolved cache entries.
 
-    # 3. Ensure mapping exists
-    cur.execute(
-        "INSERT INTO isin_rta_map (isin_code, rta_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
-        (isin_code, rta_id)
-    )
+    Only missing links are inserted: isin_rta_map's key includes effective_from
+    (CURRENT_DATE by default), so ON CONFLICT alone would add a row per ISIN every day.
+    """
+    cache = DIMENSION_CACHES[table]
+    key_index = batch.columns.index(cache.key_column)
+    resolved = cache.sync(cur, batch, counts)
+    links = sorted({
+        (isin, resolved[row[key_index]][0])
+        for isin, row in zip(batch.isins, batch.rows) if row[key_index]
+    })
+    existing = fetch_existing_links(cur, cache.map_table, cache.id_column, {isin for isin, _ in links})
+    missing = [link for link in links if link not in existing]
+    inserted = bulk_insert_ignore(cur, cache.map_table, ("isin_code", cache.id_column), missing)
+    counts[f"{cache.map_table} inserted"] += inserted
+    counts[f"{cache.map_table} skipped"] += len(links) - inserted
+    return resolved
@@ -1,21 +1,355 @@
 # isin_profile_transform.py
 import logging
-import hashlib
 import json
 import pendulum
-from config.database_config import get_mongo_client, get_postgres_connection
-from config.etl_config import MONGO_DB_NAME, MONGO_COLLECTIONS, POSTGRES_TABLES, BATCH_SIZE, TEST_MODE_LIMIT
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config.database_config import get_mongo_client, get_postgres_pool, postgres_connection, close_postgres_pool
+from config.etl_config import (
+    MONGO_DB_NAME, MONGO_COLLECTIONS, POSTGRES_TABLES, BATCH_SIZE, TEST_MODE_LIMIT,
+    MONGO_WATERMARK_FIELD, ETL_WORKERS, ETL_PIPELINE, PIPELINE_QUEUE_SIZE, PG_POOL_MAX_CONN,
+    LOG_SAMPLE_RATE, ETL_PROFILE, ETL_TIME_BUDGET_SECONDS
+)
 from utils.logging_utils import setup_logging
-from mappings.postgres_mappings import map_to_postgres,upsert_company_and_map,upsert_rta_and_map
+from mappings.postgres_mappings import map_batch_to_postgres, TABLE_SPECS, DIMENSION_CACHES, preload_dimension_caches, upsert_dimensions_and_map
+from utils.mongo_utils import (
+    iter_isin_bundles, iter_isin_codes, iter_bundles_for_isins, find_changed_isins,
+    get_high_watermarks, isin_shard, chunked, fetch_executor
+)
+from utils.checkpoint_utils import (
+    load_watermarks, save_watermarks, encode_watermark, decode_watermark,
+    BatchCheckpointer, load_checkpoint, shard_key
+)
+from utils.postgres_utils import bulk_upsert, fetch_existing_hashes
+from utils.pipeline_utils import run_pipeline
+from utils.data_cleaning import clear_parser_caches, log_parser_cache_stats
+from utils.metrics_utils import RunStats, log_run_summary, save_run_stats
+from utils.profiling_utils import RunProfiler
 
 logger = setup_logging()
 
+# Tables written with one set-based upsert per batch (keyed on isin_code)
+BULK_TABLES = ("isin_basic_info", "isin_detailed_info")
 
 
-def run_isin_profile_transform(test_mode=False):
-    """Run ETL for ISIN profile from MongoDB → PostgreSQL with detailed logging."""
-    logger.info("=== Starting ISIN profile ETL ===")
+def write_rows(cur, mapped, counts, run_stats):
+    """
+    Write a mapped batch ({table: TableBatch}) with the given cursor.
+    isin_* tables get one bulk upsert each; company/RTA rows and their maps follow,
+    so every map row finds its isin_basic_info parent. Inserted/updated/skipped row
+    counts are added to `counts`. Returns the dimension cache entries
+    ({table: {key: (id, data_hash)}}) to record once the batch commits.
+    """
+    dimension_entries = {}
+    for table in POSTGRES_TABLES:
+        batch = mapped.get(table)
+        if not batch or not batch.rows:
+            continue
+
+        with run_stats.timer(f"upsert {table}"):
+            if table in BULK_TABLES:
+                spec = TABLE_SPECS[table]
+                key_index = batch.columns.index("isin_code")
+                candidates = [row for row in batch.rows if row[key_index]]
+
+                # Compare fingerprints (last column) against the stored ones, prefetched for the whole batch
+                existing_hashes = fetch_existing_hashes(cur, table, [row[key_index] for row in candidates])
+                rows = [row for row in candidates if existing_hashes.get(row[key_index]) != row[-1]]
+
+                written = bulk_upsert(cur, table, batch.columns, rows, returning=spec.returning, sql=spec.upsert_sql)
+                inserted = sum(1 for (is_insert,) in written if is_insert)
+                counts[f"{table} inserted"] += inserted
+                counts[f"{table} updated"] += len(written) - inserted
+                counts[f"{table} skipped"] += len(candidates) - len(written)
+
+            elif table in DIMENSION_CACHES:
+                dimension_entries[table] = upsert_dimensions_and_map(cur, table, batch, counts)
+    return dimension_entries
+
+
+def load_batch(conn, mapped, isins, run_stats):
+    """
+    Load a mapped batch in a single transaction and return (failed ISINs, per-table
+    row counts). The batch is first written set-based under one savepoint; if that
+    fails it is replayed ISIN by ISIN, each under its own savepoint, so a bad record
+    only rolls back itself. Either way the batch is committed once.
+    """
+    failed = []
+    dimension_entries = []
+    table_counts = Counter()
+    with conn.cursor() as cur:
+        cur.execute("SAVEPOINT batch_load")
+        try:
+            counts = Counter()
+            dimension_entries.append(write_rows(cur, mapped, counts, run_stats))
+            cur.execute("RELEASE SAVEPOINT batch_load")
+            table_counts.update(counts)
+        except Exception as e:
+            cur.execute("ROLLBACK TO SAVEPOINT batch_load")
+            logger.warning(f"Bulk load failed ({e}); retrying batch ISIN by ISIN")
+            for isin in isins:
+                cur.execute("SAVEPOINT isin_load")
+                try:
+                    counts = Counter()
+                    selected = {table: batch.select(isin) for table, batch in mapped.items()}
+                    dimension_entries.append(write_rows(cur, selected, counts, run_stats))
+                    cur.execute("RELEASE SAVEPOINT isin_load")
+                    table_counts.update(counts)
+                except Exception as e:
+                    cur.execute("ROLLBACK TO SAVEPOINT isin_load")
+                    logger.error(f"Error inserting/updating ISIN {isin}: {e}")
+                    failed.append(isin)
+                    table_counts.update({f"{table} failed": len(batch.rows) for table, batch in selected.items()})
+    with run_stats.timer("commit"):
+        conn.commit()
+
+    # Only committed dimension rows may be reused by other batches
+    for entries in dimension_entries:
+        for table, resolved in entries.items():
+            DIMENSION_CACHES[table].update(resolved)
+    return failed, table_counts
+
+
+def dump_record(level, batch_no, isin, data, mapped):
+    """Log the raw Mongo documents and mapped Postgres rows of one ISIN."""
+    for collection, doc in data.items():
+        logger.log(level, "Fetched document from %s for ISIN %s: %s", collection, isin, dict(doc))  # dict() decodes raw BSON
+    for table, table_batch in mapped.items():
+        for row in table_batch.select(isin).rows:
+            logger.log(
+                level, "Mapped Postgres %s row for ISIN %s in batch %s: %s", table, isin, batch_no,
+                json.dumps(dict(zip(table_batch.columns, row)), indent=2, default=str)
+            )
+
+
+def map_batch(batch_no, batch, run_stats, profiler):
+    """Map one batch of (isin, data) bundles; returns (batch_no, mapped, isins, stats)."""
+    stats = Counter(isins=len(batch))
+
+    # Map the whole batch to column-ordered rows (each carrying its content fingerprint)
+    with profiler.batch(batch_no):
+        mapped, failed = map_batch_to_postgres(batch, run_stats)
+    for isin, e in failed.items():
+        logger.error(f"Mapping failed for ISIN {isin}: {e}")
+    stats["failed"] += len(failed)
+
+    # Record dumps are only built when they will be emitted: every ISIN at DEBUG,
+    # a LOG_SAMPLE_RATE share of them at INFO
+    if logger.isEnabledFor(logging.DEBUG):
+        for isin, data in batch:
+            dump_record(logging.DEBUG, batch_no, isin, data, mapped)
+    elif LOG_SAMPLE_RATE > 0 and logger.isEnabledFor(logging.INFO):
+        for isin, data in batch:
+            if random.random() < LOG_SAMPLE_RATE:
+                dump_record(logging.INFO, batch_no, isin, data, mapped)
+
+    isins = [isin for isin, _ in batch if isin not in failed]
+    return batch_no, mapped, isins, stats
+
+
+def checkpoint_batch(checkpointer, batch_no, stats):
+    """Record a finished batch; a checkpoint that cannot be saved only costs redoing batches on resume."""
+    try:
+        checkpointer.batch_finished(batch_no, stats)
+    except Exception as e:
+        logger.warning(f"Could not save the checkpoint after batch {batch_no}: {e}")
+
+
+def write_batch(batch_no, mapped, isins, stats, run_stats, profiler, checkpointer):
+    """
+    Upsert one mapped batch on a pooled connection, add the outcome to `stats` and
+    `run_stats` and checkpoint it.
+    """
+    if not isins:
+        run_stats.batch_finished(batch_no, 0)
+        checkpoint_batch(checkpointer, batch_no, stats)
+        return stats
+    with profiler.batch(batch_no), postgres_connection() as conn:
+        try:
+            failed, table_counts = load_batch(conn, mapped, isins, run_stats)
+            stats["loaded"] += len(isins) - len(failed)
+            stats["failed"] += len(failed)
+            run_stats.batch_finished(batch_no, len(isins) - len(failed))
+            tables = ", ".join(f"{key} {count}" for key, count in sorted(table_counts.items()))
+            logger.info(f"Batch {batch_no}: loaded {len(isins) - len(failed)} ISINs, {len(failed)} failed ({tables}).")
+        except Exception as e:
+            logger.error(f"Error inserting/updating batch {batch_no}: {e}")
+            stats["failed"] += len(isins)
+            table_counts = Counter({f"{table} failed": len(batch.rows) for table, batch in mapped.items()})
+            conn.rollback()
+    run_stats.count_rows(table_counts)
+    # Failed ISINs are counted in the checkpoint, so they still hold the watermarks back after a resume
+    checkpoint_batch(checkpointer, batch_no, stats)
+    return stats
+
+
+def process_batch(batch_no, batch, run_stats, profiler, checkpointer):
+    """Map and load one batch of (isin, data) bundles; returns its stats."""
+    return write_batch(*map_batch(batch_no, batch, run_stats, profiler), run_stats, profiler, checkpointer)
+
+
+def batch_failed(batch_no, size, e, checkpointer):
+    """
+    Stats of a batch whose processing raised (e.g. on pool checkout or in map_batch).
+    It is checkpointed as failed, so the low-water mark moves past it while its
+    failed ISINs still hold the watermarks back.
+    """
+    logger.exception(f"Worker failed on batch {batch_no}: {e}")
+    stats = Counter(isins=size, failed=size)
+    checkpoint_batch(checkpointer, batch_no, stats)
+    return stats
+
+
+def run_batches(batches, workers, run_stats, profiler, checkpointer):
+    """
+    Run process_batch over (batch_no, batch) pairs and return the summed stats.
+    With more than one worker, batches are fanned out to a thread pool; each worker
+    checks out its own pooled connection. At most 2 × workers batches are in
+    flight, so the extraction stream is never read far ahead.
+    """
+    totals = Counter()
+    if workers <= 1:
+        for batch_no, batch in batches:
+            try:
+                totals.update(process_batch(batch_no, batch, run_stats, profiler, checkpointer))
+            except Exception as e:
+                totals.update(batch_failed(batch_no, len(batch), e, checkpointer))
+        return totals
+
+    def collect(done):
+        for future in done:
+            batch_no, size = pending.pop(future)
+            try:
+                totals.update(future.result())
+            except Exception as e:
+                totals.update(batch_failed(batch_no, size, e, checkpointer))
+
+    pending = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="isin_etl") as executor:
+        for batch_no, batch in batches:
+            pending[executor.submit(process_batch, batch_no, batch, run_stats, profiler, checkpointer)] = (batch_no, len(batch))
+            if len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        collect(wait(pending).done)
+    return totals
+
+
+def run_pipelined(batches, workers, run_stats, profiler, checkpointer):
+    """
+    Overlap the three stages: Mongo reads, map_batch_to_postgres and Postgres writes
+    each run on their own threads (`workers` writer threads), linked by bounded queues.
+    A batch that fails in either stage is counted as failed, as in run_batches.
+    """
+    totals = Counter()
+    lock = threading.Lock()
+
+    def transform(item):
+        batch_no, batch = item
+        try:
+            return batch_no, len(batch), map_batch(batch_no, batch, run_stats, profiler)
+        except Exception as e:
+            return batch_no, len(batch), e
+
+    def load(item):
+        batch_no, size, mapped = item
+        try:
+            if isinstance(mapped, Exception):
+                raise mapped
+            stats = write_batch(*mapped, run_stats, profiler, checkpointer)
+        except Exception as e:
+            stats = batch_failed(batch_no, size, e, checkpointer)
+        with lock:
+            totals.update(stats)
+
+    run_pipeline(
+        batches,
+        transform=transform,
+        load=load,
+        loaders=workers,
+        queue_size=PIPELINE_QUEUE_SIZE,
+    )
+    return totals
+
+
+def iter_batches(bundles, run_stats, checkpointer, test_mode=False, deadline=None):
+    """
+    Split the bundle stream into numbered batches of BATCH_SIZE (trimmed in test mode).
+    Once time.monotonic() passes `deadline`, no further batch is handed out and the
+    checkpointer is flagged as stopped early.
+    """
+    for batch_no, batch in enumerate(chunked(bundles, BATCH_SIZE), start=1):
+        # Checked once the next chunk has been read, so a run whose stream is already
+        # exhausted is never flagged as stopped early
+        if deadline is not None and time.monotonic() >= deadline:
+            logger.warning(f"Time budget spent: stopping before batch {batch_no}, batches in flight still finish")
+            checkpointer.stopped_early = True
+            return
+        run_stats.batch_started(batch_no)
+        checkpointer.batch_started(batch_no, batch[-1][0])
+        if test_mode:
+            logger.info(f"Processing batch {batch_no} with original size {len(batch)}")
+            batch = batch[:TEST_MODE_LIMIT]
+            logger.info(f"Batch trimmed to TEST_MODE_LIMIT={TEST_MODE_LIMIT}, size={len(batch)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Batch ISINs: {[isin for isin, _ in batch]}")
+        yield batch_no, batch
+
+
+def incremental_watermark_field():
+    """
+    Return MONGO_WATERMARK_FIELD if it can drive incremental extraction, else None
+    (with a warning): the run then falls back to a full scan.
+    """
+    if not MONGO_WATERMARK_FIELD:
+        logger.warning("MONGO_WATERMARK_FIELD is not set: running a full scan. Set it to an update timestamp field for incremental runs.")
+        return None
+    if MONGO_WATERMARK_FIELD == "_id":
+        logger.warning("MONGO_WATERMARK_FIELD=_id only moves forward on inserts and would miss updated documents: running a full scan.")
+        return None
+    return MONGO_WATERMARK_FIELD
+
+
+def run_isin_profile_transform(test_mode=False, full_refresh=False, workers=None, shard=None, num_shards=None,
+                               pipeline=None, profile=None, run_id=None, time_budget=None):
+    """
+    Run ETL for ISIN profile from MongoDB → PostgreSQL with detailed logging.
+    Only documents changed since the last successful run (on MONGO_WATERMARK_FIELD)
+    are extracted, unless `full_refresh` is set, no update timestamp field is
+    configured or no watermark has been stored yet. Batches are mapped
+    and loaded by `workers` threads (default ETL_WORKERS). Returns the run stats.
+
+    With `num_shards`, only ISINs where isin_shard(isin, num_shards) == `shard` are
+    processed and watermarks are left to aggregate_shard_results. With `pipeline`
+    (default ETL_PIPELINE), extract, map and load run as overlapped stages.
+    `profile` ("run" or "batches", default ETL_PROFILE) turns on cProfile/tracemalloc
+    profiling, written next to the log file.
+
+    With a `run_id` (and outside test mode), committed batches are checkpointed: an
+    interrupted run resumes after its last committed ISIN, on retry or in the next
+    run. `time_budget` (seconds, default ETL_TIME_BUDGET_SECONDS) stops the run at a
+    batch boundary; it then returns with "incomplete" set and the watermarks unchanged.
+    """
+    sharded = bool(num_shards)
+    if sharded and not 0 <= shard < num_shards:
+        raise ValueError(f"shard must be in [0, {num_shards}), got {shard}")
+    shard_label = f" (shard {shard}/{num_shards})" if sharded else ""
+    logger.info(f"=== Starting ISIN profile ETL{shard_label} ===")
     mongo_client = None
+    mongo_executor = None
+    workers = max(1, workers or ETL_WORKERS)
+    pipeline = ETL_PIPELINE if pipeline is None else pipeline
+    time_budget = ETL_TIME_BUDGET_SECONDS if time_budget is None else time_budget
+    deadline = time.monotonic() + time_budget if time_budget else None
+    checkpoint_key = shard_key(shard, num_shards)
+    checkpoint_run_id = None if test_mode else run_id  # test runs trim batches, so they never checkpoint
+    clear_parser_caches()  # per-run hit/miss counters
+    run_stats = RunStats()
+    profiler = RunProfiler(profile or ETL_PROFILE, label=f"_shard{shard}" if sharded else "")
+    profiler.start()
 
     try:
         # 1️⃣ MongoDB setup
@@ -26,125 +360,150 @@ def run_isin_profile_transform(test_mode=False):
 
         if test_mode:
             logger.info("TEST MODE ENABLED: Extra logging active.")
-
-        # 2️⃣ Fetch unique ISINs
-        isins = set()
-        for collection in MONGO_COLLECTIONS:
-            logger.info(f"Fetching ISINs from collection: {collection}")
-            cursor = db[collection].find({}, {"ISIN_CODE": 1})
-            count = 0
-            for doc in cursor:
-                if "ISIN_CODE" in doc:
-                    isins.add(doc["ISIN_CODE"])
-                    count += 1
-            logger.info(f"Fetched {count} ISINs from collection {collection}")
-            if test_mode:
+            for collection in MONGO_COLLECTIONS:
                 total_docs = db[collection].count_documents({})
                 logger.info(f"Total documents in collection {collection}: {total_docs}")
 
-        if not isins:
-            logger.warning("No ISINs found. Exiting ETL.")
-            return
-        logger.info(f"Total unique ISINs to process: {len(isins)}")
-
-        # 3️⃣ Process in batches
-        for i in range(0, len(isins), BATCH_SIZE):
-            batch = list(isins)[i:i + BATCH_SIZE]
-            if test_mode:
-                logger.info(f"Processing batch {i // BATCH_SIZE + 1} with original size {len(batch)}")
-                batch = batch[:TEST_MODE_LIMIT]
-                logger.info(f"Batch trimmed to TEST_MODE_LIMIT={TEST_MODE_LIMIT}, size={len(batch)}")
-                logger.debug(f"Batch ISINs: {batch}")
-
-            for isin in batch:
-                logger.info(f"Processing ISIN: {isin}")
-
-                #  Fetch all documents for this ISIN
-                data = {}
-                for collection in MONGO_COLLECTIONS:
-                    doc = db[collection].find_one({"ISIN_CODE": isin})
-                    if doc:
-                        data[collection] = doc
-                        logger.debug(f"Fetched document from {collection} for ISIN {isin}: {doc}")
-                if not data:
-                    logger.warning(f"No data found for ISIN {isin}. Skipping...")
-                    continue
-
-                # 3b️⃣ Map data to Postgres format
-                try:
-                    mapped_postgres_data = map_to_postgres(data)
-                    logger.debug(f"Mapped Postgres data for ISIN {isin}: {json.dumps(mapped_postgres_data, indent=2, default=str)}")
-                except Exception as e:
-                    logger.error(f"Mapping failed for ISIN {isin}: {e}")
-                    continue
+        # One pooled connection per worker, plus one for the main thread
+        get_postgres_pool(maxconn=max(PG_POOL_MAX_CONN, workers + 1))
 
-                # 3c️⃣ Compute hash for incremental load
-                data_str = json.dumps(mapped_postgres_data, sort_keys=True, default=str)
-                data_hash = hashlib.sha256(data_str.encode()).hexdigest()
-                logger.info(f"Computed hash for ISIN {isin}: {data_hash}")
+        # 2️⃣ Pick the extraction mode: full scan or changes since the last watermark
+        watermark_field = incremental_watermark_field()
+        with postgres_connection() as conn:
+            since = {} if full_refresh or not watermark_field else load_watermarks(conn, watermark_field)
+            mode = "incremental" if since else "full"
+            resumed = load_checkpoint(conn, checkpoint_run_id, checkpoint_key, mode) if checkpoint_run_id else None
+            with conn.cursor() as cur:
+                preload_dimension_caches(cur)
+            conn.commit()
 
-                # 3d️⃣ Upsert into Postgres
-                logger.info(f"Connecting to PostgreSQL for ISIN {isin}...")
-                conn = get_postgres_connection()
-                try:
-                    with conn.cursor() as cur:
-                        for table in POSTGRES_TABLES:
-                            table_data = mapped_postgres_data.get(table)
-                            if not table_data:
-                                logger.debug(f"No data for table {table} and ISIN {isin}, skipping...")
-                                continue
-
-                            if table == "company_info":
-                                upsert_company_and_map(cur, isin, table_data)
-                            elif table == "rta_info":
-                                upsert_rta_and_map(cur, isin, table_data)
-                            else:
-                                # Check existing hash
-                                cur.execute(f"SELECT data_hash FROM {table} WHERE isin_code = %s", (isin,))
-                                existing = cur.fetchone()
-                                existing_hash = existing[0] if existing else None
-
-                                if existing_hash == data_hash:
-                                    logger.info(f"ISIN {isin} in {table}: skipped (no changes).")
-                                    continue
-
-                                # Insert/Update row
-                                columns = list(table_data.keys())
-                                values = [table_data[col] for col in columns]
-
-                                placeholders = ", ".join(["%s"] * len(columns))
-                                columns_str = ", ".join(columns)
-                                update_str = ", ".join([f"{col} = EXCLUDED.{col}" for col in columns if col != "isin_code"])
-
-                                cur.execute(
-                                    f"""
-                                    INSERT INTO {table} ({columns_str})
-                                    VALUES ({placeholders})
-                                    ON CONFLICT (isin_code)
-                                    DO UPDATE SET {update_str}
-                                    """,
-                                    values
-                                )
-
-                                logger.info(f"ISIN {isin} in {table}: inserted/updated.")
+        # A resumed run finishes the window of the run it resumes, so the watermarks stay consistent
+        after = None
+        if resumed:
+            after = resumed["last_isin"]
+            until = {collection: decode_watermark(text) for collection, text in resumed["watermarks"].items()}
+            logger.info(
+                f"Resuming {mode} run {resumed['run_id']}{shard_label} after ISIN {after} "
+                f"({resumed['batches']} batches, {resumed['isins']} ISINs already done)"
+            )
+        else:
+            until = get_high_watermarks(db, watermark_field) if watermark_field else {}
+        checkpointer = BatchCheckpointer(checkpoint_run_id, checkpoint_key, mode, until, postgres_connection, resumed)
 
-                except Exception as e:
-                    logger.error(f"Error inserting/updating ISIN {isin}: {e}")
-                    conn.rollback()
-                finally:
-                    conn.close()
-                    logger.debug(f"Postgres connection closed for ISIN {isin}")
+        if since:
+            logger.info(f"Incremental run on {watermark_field} since watermarks: {since}")
+            isins = run_stats.timed(find_changed_isins(db, watermark_field, since, until, after=after), "discover")
+        else:
+            logger.info("Full run: scanning all collections" + (" (forced rebuild)" if full_refresh else ""))
+            isins = run_stats.timed(iter_isin_codes(db, after=after), "discover") if sharded else None
+
+        if isins is None:
+            bundles = iter_isin_bundles(db, after=after)
+        else:
+            if sharded:
+                isins = (isin for isin in isins if isin_shard(isin, num_shards) == shard)
+            mongo_executor = fetch_executor()  # one pool for every $in batch of the run
+            bundles = iter_bundles_for_isins(db, isins, BATCH_SIZE, mongo_executor)
+
+        # 3️⃣ Map and load the bundle stream batch by batch
+        batches = iter_batches(run_stats.timed(bundles, "mongo_fetch"), run_stats, checkpointer, test_mode, deadline)
+        if deadline is not None:
+            logger.info(f"Time budget: {time_budget:.0f}s")
+        if pipeline:
+            logger.info(f"Processing batches as a pipeline with {workers} writer(s)")
+            stats = run_pipelined(batches, workers, run_stats, profiler, checkpointer)
+        else:
+            logger.info(f"Processing batches with {workers} worker(s)")
+            stats = run_batches(batches, workers, run_stats, profiler, checkpointer)
 
+        log_parser_cache_stats(logger)
+
+        # Per-stage timings, throughput and per-table row counts (returned to XCom too)
+        summary = run_stats.summary(stats)
+        stats["run_stats"] = summary
+        log_run_summary(summary, shard_label)
+        try:
+            with postgres_connection() as conn:
+                save_run_stats(conn, summary, mode, run_id=run_id, shard=shard, num_shards=num_shards)
+        except Exception as e:
+            logger.warning(f"Could not save run stats: {e}")
+
+        # ISINs loaded by the attempts this run resumed count towards its totals
+        stats.update(checkpointer.resumed_totals)
+
+        # 4️⃣ Advance the watermarks only after a complete, clean run
+        if checkpointer.stopped_early:
+            stats["incomplete"] = 1
+            logger.warning(
+                f"Run stopped by its time budget{shard_label} after ISIN {checkpointer.last_isin}; "
+                "the next run resumes from there."
+            )
+        else:
+            checkpointer.complete()
+
+        if sharded:
+            stats["watermarks"] = {collection: encode_watermark(value) for collection, value in until.items()}
+            logger.info("Sharded run: watermarks are advanced by the aggregate task.")
+        elif test_mode:
+            logger.info("TEST MODE: watermarks not advanced.")
+        elif stats["incomplete"]:
+            logger.info("Incomplete run: watermarks not advanced.")
+        elif stats["failed"]:
+            logger.warning(f"{stats['failed']} ISINs failed; watermarks not advanced so they are retried next run.")
+        elif until:
+            with postgres_connection() as conn:
+                save_watermarks(conn, watermark_field, until)
+
+        if not stats["isins"]:
+            logger.warning(f"No ISINs found{shard_label}. Exiting ETL.")
+            return dict(stats)
+        logger.info(f"Total unique ISINs processed{shard_label}: {stats['isins']} (loaded {stats['loaded']}, failed {stats['failed']})")
         logger.info("=== ETL completed successfully ===")
+        return dict(stats)
 
     except Exception as e:
         logger.exception(f"ETL failed: {e}")
         raise
     finally:
+        try:
+            profiler.stop()
+        except Exception as e:
+            logger.warning(f"Could not write the profile: {e}")
+        if mongo_executor:
+            mongo_executor.shutdown()
         if mongo_client:
             mongo_client.close()
             logger.debug("MongoDB connection closed")
+        close_postgres_pool()
+
+
+def aggregate_shard_results(results, test_mode=False):
+    """
+    Combine the stats returned by every shard of a sharded run. Watermarks are
+    advanced once, to the lowest per-collection watermark any shard saw, and only
+    when every shard went through all its batches without failed ISINs.
+    """
+    results = [result for result in results if result]
+    totals = Counter()
+    until = {}
+    for result in results:
+        totals.update({key: value for key, value in result.items() if not isinstance(value, dict)})
+        for collection, text in result.get("watermarks", {}).items():
+            value = decode_watermark(text)
+            until[collection] = min(until[collection], value) if collection in until else value
 
+    logger.info(f"Aggregated {len(results)} shards: {dict(totals)}")
+    if test_mode:
+        logger.info("TEST MODE: watermarks not advanced.")
+    elif totals["incomplete"]:
+        logger.warning(f"{totals['incomplete']} shard(s) stopped by the time budget; watermarks not advanced.")
+    elif totals["failed"]:
+        logger.warning(f"{totals['failed']} ISINs failed across shards; watermarks not advanced.")
+    elif until:
+        with postgres_connection() as conn:
+            save_watermarks(conn, MONGO_WATERMARK_FIELD, until)
+        close_postgres_pool()
+    return dict(totals)
 
 
 if __name__ == "__main__":
@@ -152,5 +152,6 @@ examples = [
     "",
 ]
 
-for ex in examples:
-    print(ex, "=>", parse_coupon_rate(ex))
+if __name__ == "__main__":
+    for ex in examples:
+        print(ex, "=>", parse_coupon_rate(ex))
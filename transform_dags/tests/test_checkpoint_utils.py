@@ -0,0 +1,64 @@
+from collections import Counter
+from contextlib import nullcontext
+
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("pendulum")
+
+from utils import checkpoint_utils  # noqa: E402
+from utils.checkpoint_utils import BatchCheckpointer  # noqa: E402
+
+
+@pytest.fixture
+def saved(monkeypatch):
+    """Checkpoints written by BatchCheckpointer, as (last_isin, batches, totals)."""
+    saved = []
+
+    def save_checkpoint(conn, run_id, key, mode, last_isin, batches, totals, watermarks):
+        saved.append((last_isin, batches, dict(totals)))
+
+    monkeypatch.setattr(checkpoint_utils, "save_checkpoint", save_checkpoint)
+    return saved
+
+
+def start(checkpointer, batches=3):
+    for batch_no in range(1, batches + 1):
+        checkpointer.batch_started(batch_no, f"INE{batch_no * 100:09d}")
+
+
+def test_low_water_mark_waits_for_out_of_order_batches(saved):
+    checkpointer = BatchCheckpointer("run", "all", "full", {}, nullcontext)
+    start(checkpointer)
+
+    checkpointer.batch_finished(2, Counter(isins=100, loaded=100))
+    assert saved == []  # batch 1 is still in flight
+    assert checkpointer.last_isin is None
+
+    checkpointer.batch_finished(1, Counter(isins=100, failed=100))  # a failed batch still moves the mark
+    assert saved == [("INE000000200", 2, {"isins": 200, "loaded": 100, "failed": 100})]
+
+    checkpointer.batch_finished(3, Counter(isins=50, loaded=49, failed=1))
+    assert saved[-1] == ("INE000000300", 3, {"isins": 250, "loaded": 149, "failed": 101})
+    assert checkpointer.last_isin == "INE000000300"
+
+
+def test_resumed_totals_carry_into_the_checkpoint(saved):
+    resumed = {"run_id": "earlier", "last_isin": "INE000000099", "batches": 4, "isins": 400, "loaded": 390, "failed": 10}
+    checkpointer = BatchCheckpointer("run", "all", "full", {}, nullcontext, resumed)
+    start(checkpointer, batches=1)
+
+    checkpointer.batch_finished(1, Counter(isins=100, loaded=100))
+
+    assert saved == [("INE000000100", 5, {"isins": 500, "loaded": 490, "failed": 10})]
+    assert checkpointer.resumed_totals == Counter(isins=400, loaded=390, failed=10)
+
+
+def test_nothing_is_saved_without_a_run_id(saved):
+    checkpointer = BatchCheckpointer(None, "all", "full", {}, nullcontext)
+    start(checkpointer, batches=1)
+
+    checkpointer.batch_finished(1, Counter(isins=100, loaded=100))
+
+    assert saved == []
+    assert checkpointer.last_isin == "INE000000100"
@@ -0,0 +1,44 @@
+from datetime import date
+
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("pendulum")
+
+from utils.data_cleaning import clear_parser_caches, parse_date, parse_decimal  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    clear_parser_caches()
+    yield
+    clear_parser_caches()
+
+
+@pytest.mark.parametrize("first, second", [
+    (1, True),
+    (True, 1),
+    (0, False),
+    (1000.0, 1000),
+    (1000, 1000.0),
+])
+def test_memoized_parser_results_do_not_depend_on_cache_history(first, second):
+    expected = parse_decimal.func("F", second)
+
+    parse_decimal("F", first)
+
+    result = parse_decimal("F", second)
+    assert result == expected
+    assert repr(result) == repr(expected)  # compute_row_hash fingerprints the repr
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("12-08-1765", date(1765, 8, 12)),
+    ("12/08/1765", date(1765, 8, 12)),
+    ("2-8-1765", date(1765, 8, 2)),
+    ("31-02-2024", None),
+    ("\u06612-08-1765", None),  # Arabic-Indic digit: rejected like strptime does
+    ("１2-08-1765", None),  # fullwidth digit
+])
+def test_parse_date_matches_strptime(value, expected):
+    assert parse_date(value) == expected
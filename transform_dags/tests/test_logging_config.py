@@ -0,0 +1,89 @@
+import logging
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("pendulum")
+
+from config import logging_config  # noqa: E402
+from config.logging_config import setup_logging  # noqa: E402
+
+
+@pytest.fixture
+def airflow_like_root():
+    """Configure the root logger the way Airflow does, and leave isin_etl unconfigured."""
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    root.handlers[:] = [logging.StreamHandler()]
+    root.setLevel(logging.INFO)
+
+    logger = logging.getLogger("isin_etl")
+    logger.handlers.clear()
+    logger.setLevel(logging.NOTSET)
+    logger.propagate = True
+    yield logger
+
+    for handler in logger.handlers:
+        handler.close()
+    logger.handlers.clear()
+    logging_config._stop_listeners()
+    logging_config._queued_loggers.pop("isin_etl", None)
+    root.handlers[:] = saved_handlers
+    root.setLevel(saved_level)
+
+
+def test_setup_logging_configures_isin_etl_under_a_configured_root(airflow_like_root, tmp_path):
+    logger = setup_logging("isin_etl", log_dir=str(tmp_path), level="WARNING", use_queue=False)
+
+    assert logger is airflow_like_root
+    assert logger.level == logging.WARNING
+    assert not logger.isEnabledFor(logging.INFO)
+    assert [type(handler) for handler in logger.handlers] == [RotatingFileHandler]  # stdout is root's job
+    assert logger.propagate
+
+
+def test_setup_logging_installs_the_queue_under_a_configured_root(airflow_like_root, tmp_path):
+    logger = setup_logging("isin_etl", log_dir=str(tmp_path), level="DEBUG", use_queue=True)
+
+    assert logger.level == logging.DEBUG
+    assert [type(handler) for handler in logger.handlers] == [QueueHandler]
+    assert logging_config._queued_loggers["isin_etl"][2] is not None  # listener running
+    assert not logger.propagate  # the listener forwards to root instead
+
+
+class _Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@pytest.mark.parametrize("use_queue", [False, True])
+def test_records_reach_the_root_handlers_installed_after_setup(airflow_like_root, tmp_path, use_queue):
+    logger = setup_logging("isin_etl", log_dir=str(tmp_path), level="INFO", use_queue=use_queue)
+    task_handler = _Collect()
+    logging.getLogger().handlers[:] = [task_handler]  # Airflow swaps in the task log handler
+
+    logger.info("batch 1 loaded")
+    logging_config.flush_logging()
+
+    assert task_handler.messages == ["batch 1 loaded"]  # exactly once
+
+
+def test_setup_logging_applies_the_level_on_every_call(airflow_like_root, tmp_path):
+    setup_logging("isin_etl", log_dir=str(tmp_path), level="INFO", use_queue=False)
+    logger = setup_logging("isin_etl", log_dir=str(tmp_path), level="ERROR", use_queue=False)
+
+    assert logger.level == logging.ERROR
+    assert len(logger.handlers) == 1  # no duplicate handlers
+
+
+def test_setup_logging_prints_to_stdout_when_root_is_not_configured(airflow_like_root, tmp_path):
+    logging.getLogger().handlers[:] = []
+
+    logger = setup_logging("isin_etl", log_dir=str(tmp_path), level="INFO", use_queue=False)
+
+    assert [type(handler) for handler in logger.handlers] == [RotatingFileHandler, logging.StreamHandler]
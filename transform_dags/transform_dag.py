@@ -3,23 +3,71 @@
 from airflow import DAG
 from airflow.operators.python import PythonOperator
 import pendulum
-from scripts.isin_profile_transform import run_isin_profile_transform
+from config.etl_config import ETL_NUM_SHARDS
+from config.logging_config import flush_logging
+from scripts.isin_profile_transform import run_isin_profile_transform, aggregate_shard_results
+
+TEST_MODE = True  # Set True if testing
 
 with DAG(
     dag_id="isin_profile_transform_dag",
     start_date=pendulum.datetime(2025, 9, 19, tz="Asia/Kolkata"),
-    schedule_interval="@daily", 
+    schedule_interval="@daily",
     catchup=False,
     tags=["isin", "transform", "postgres"]
 ) as dag:
 
-    def run_isin_profile_task(test_mode=False):
-        """Wrapper for Airflow task"""
-        run_isin_profile_transform(test_mode=test_mode)
+    def run_isin_profile_task(run_id, test_mode=False, full_refresh=False, workers=None, shard=None, num_shards=None,
+                              pipeline=None, profile=None, time_budget=None):
+        """Wrapper for Airflow task (one mapped task per shard); run_id comes from the task context"""
+        try:
+            return run_isin_profile_transform(
+                test_mode=test_mode,
+                full_refresh=full_refresh,
+                workers=workers,
+                shard=shard,
+                num_shards=num_shards,
+                pipeline=pipeline,
+                profile=profile,
+                run_id=run_id,  # checkpoints are keyed on it, so a retry resumes where the attempt stopped
+                time_budget=time_budget,
+            )
+        finally:
+            flush_logging()  # queued records must be written before the task process exits
+
+    def aggregate_isin_profile_task(ti, test_mode=False):
+        """Sum the per-shard stats and advance the watermarks once every shard succeeded"""
+        results = ti.xcom_pull(task_ids="isin_profile_etl")  # one entry per mapped shard
+        try:
+            return aggregate_shard_results(list(results or []), test_mode=test_mode)
+        finally:
+            flush_logging()
 
-    isin_profile_etl = PythonOperator(
+    # One mapped task per shard, so a failed shard is retried on its own
+    isin_profile_etl = PythonOperator.partial(
         task_id="isin_profile_etl",
         python_callable=run_isin_profile_task,
-        op_kwargs={"test_mode": True},   # Set True if testing
+        retries=2,
+    ).expand(
+        op_kwargs=[
+            {
+                "test_mode": TEST_MODE,
+                "full_refresh": False,   # Set True to rescan every collection (forced rebuild)
+                "workers": None,         # None = ETL_WORKERS from etl_config
+                "pipeline": None,        # None = ETL_PIPELINE from etl_config
+                "profile": None,         # "run" / "batches" to profile; None = ETL_PROFILE from etl_config
+                "time_budget": None,     # seconds before stopping at a batch boundary; None = ETL_TIME_BUDGET_SECONDS
+                "shard": shard,
+                "num_shards": ETL_NUM_SHARDS,
+            }
+            for shard in range(ETL_NUM_SHARDS)
+        ]
+    )
+
+    isin_profile_aggregate = PythonOperator(
+        task_id="isin_profile_aggregate",
+        python_callable=aggregate_isin_profile_task,
+        op_kwargs={"test_mode": TEST_MODE},
     )
 
+    isin_profile_etl >> isin_profile_aggregate
@@ -0,0 +1,223 @@
+import json
+import threading
+from collections import Counter
+from datetime import datetime
+from config.etl_config import WATERMARK_TABLE, CHECKPOINT_TABLE
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+
+def ensure_watermark_table(cur):
+    """Create the per-collection watermark table if it does not exist yet."""
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+            collection_name VARCHAR(100) PRIMARY KEY,
+            watermark_field VARCHAR(100) NOT NULL,
+            watermark_value TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def encode_watermark(value):
+    """Serialize an update timestamp watermark to text."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def decode_watermark(text):
+    """Inverse of encode_watermark."""
+    return datetime.fromisoformat(text)
+
+
+def load_watermarks(conn, field):
+    """Return {collection: watermark} for the given field from the last successful run."""
+    with conn.cursor() as cur:
+        ensure_watermark_table(cur)
+        cur.execute(
+            f"SELECT collection_name, watermark_value FROM {WATERMARK_TABLE} WHERE watermark_field = %s",
+            (field,)
+        )
+        rows = cur.fetchall()
+    conn.commit()
+    return {collection: decode_watermark(value) for collection, value in rows}
+
+
+def save_watermarks(conn, field, watermarks):
+    """Persist {collection: watermark} once a run has finished successfully."""
+    with conn.cursor() as cur:
+        ensure_watermark_table(cur)
+        for collection, value in watermarks.items():
+            cur.execute(
+                f"""
+                INSERT INTO {WATERMARK_TABLE} (collection_name, watermark_field, watermark_value, updated_at)
+                VALUES (%s, %s, %s, NOW())
+                ON CONFLICT (collection_name)
+                DO UPDATE SET watermark_field = EXCLUDED.watermark_field,
+                              watermark_value = EXCLUDED.watermark_value,
+                              updated_at = NOW()
+                """,
+                (collection, field, encode_watermark(value))
+            )
+    conn.commit()
+    logger.info(f"Saved watermarks on {field} for {len(watermarks)} collections")
+
+
+# ---------------- BATCH CHECKPOINTS ----------------
+CHECKPOINT_TOTALS = ("isins", "loaded", "failed")
+
+
+def shard_key(shard=None, num_shards=None):
+    """Checkpoint key of one shard ("3/8"), or "all" for an unsharded run."""
+    return f"{shard}/{num_shards}" if num_shards else "all"
+
+
+def ensure_checkpoint_table(cur):
+    """Create the per-run batch checkpoint table if it does not exist yet."""
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+            run_id VARCHAR(255) NOT NULL,
+            shard_key VARCHAR(20) NOT NULL,
+            mode VARCHAR(20) NOT NULL,
+            last_isin VARCHAR(12),
+            batches INTEGER NOT NULL DEFAULT 0,
+            isins INTEGER NOT NULL DEFAULT 0,
+            loaded INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            watermarks JSONB,
+            completed BOOLEAN NOT NULL DEFAULT FALSE,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (run_id, shard_key)
+        )
+    """)
+
+
+def load_checkpoint(conn, run_id, key, mode):
+    """
+    Return the unfinished checkpoint to resume from as a dict: this run's own (an
+    Airflow retry), else the latest one left by an earlier run of the same shard
+    and mode (stopped by its time budget, or killed). None when there is none.
+    """
+    with conn.cursor() as cur:
+        ensure_checkpoint_table(cur)
+        cur.execute(
+            f"""
+            SELECT run_id, last_isin, batches, isins, loaded, failed, watermarks
+            FROM {CHECKPOINT_TABLE}
+            WHERE shard_key = %s AND mode = %s AND NOT completed AND last_isin IS NOT NULL
+            ORDER BY run_id = %s DESC, updated_at DESC
+            LIMIT 1
+            """,
+            (key, mode, run_id)
+        )
+        row = cur.fetchone()
+    conn.commit()
+    if row is None:
+        return None
+    return dict(zip(("run_id", "last_isin", "batches") + CHECKPOINT_TOTALS + ("watermarks",), row))
+
+
+def save_checkpoint(conn, run_id, key, mode, last_isin, batches, totals, watermarks):
+    """Record that every ISIN up to `last_isin` has been committed."""
+    with conn.cursor() as cur:
+        ensure_checkpoint_table(cur)
+        cur.execute(
+            f"""
+            INSERT INTO {CHECKPOINT_TABLE} (
+                run_id, shard_key, mode, last_isin, batches, isins, loaded, failed, watermarks, completed, updated_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, FALSE, NOW())
+            ON CONFLICT (run_id, shard_key)
+            DO UPDATE SET mode = EXCLUDED.mode,
+                          last_isin = EXCLUDED.last_isin,
+                          batches = EXCLUDED.batches,
+                          isins = EXCLUDED.isins,
+                          loaded = EXCLUDED.loaded,
+                          failed = EXCLUDED.failed,
+                          watermarks = EXCLUDED.watermarks,
+                          completed = FALSE,
+                          updated_at = NOW()
+            """,
+            (
+                run_id, key, mode, last_isin, batches,
+                *(totals[total] for total in CHECKPOINT_TOTALS),
+                json.dumps({collection: encode_watermark(value) for collection, value in watermarks.items()}),
+            )
+        )
+    conn.commit()
+
+
+def complete_checkpoints(conn, key):
+    """Mark every unfinished checkpoint of a shard as done, so no later run resumes from it."""
+    with conn.cursor() as cur:
+        ensure_checkpoint_table(cur)
+        cur.execute(
+            f"UPDATE {CHECKPOINT_TABLE} SET completed = TRUE, updated_at = NOW() WHERE shard_key = %s AND NOT completed",
+            (key,)
+        )
+    conn.commit()
+
+
+class BatchCheckpointer:
+    """
+    Run-scoped tracker of committed batches, persisted with save_checkpoint.
+
+    Batches are numbered in ISIN order but may commit out of order, so the
+    checkpoint is a contiguous low-water mark: the last ISIN of the highest batch
+    that has committed together with every batch before it. Resuming with
+    ISIN_CODE > last_isin therefore only redoes batches that were in flight,
+    and those upserts are idempotent. `connect` is a context manager factory
+    yielding a Postgres connection. With run_id None nothing is persisted.
+    """
+
+    def __init__(self, run_id, key, mode, watermarks, connect, resumed=None):
+        resumed = resumed or {}
+        self.run_id = run_id
+        self.key = key
+        self.mode = mode
+        self.watermarks = watermarks
+        self.connect = connect
+        self.last_isin = resumed.get("last_isin")
+        self.batches = resumed.get("batches", 0)
+        # Totals of the ISINs loaded by earlier attempts, so their failures still hold the watermarks back
+        self.resumed_totals = Counter({total: resumed.get(total, 0) for total in CHECKPOINT_TOTALS})
+        self.stopped_early = False
+        self._totals = Counter(self.resumed_totals)
+        self._last_isins = {}
+        self._finished = {}
+        self._next_batch = 1
+        self._lock = threading.Lock()
+
+    def batch_started(self, batch_no, last_isin):
+        """Remember the last ISIN of a batch handed to the workers."""
+        with self._lock:
+            self._last_isins[batch_no] = last_isin
+
+    def batch_finished(self, batch_no, stats):
+        """Mark a batch as committed and persist the checkpoint if the low-water mark moved."""
+        with self._lock:
+            self._finished[batch_no] = stats
+            advanced = False
+            while self._next_batch in self._finished:
+                done = self._finished.pop(self._next_batch)
+                self._totals.update({total: done[total] for total in CHECKPOINT_TOTALS})
+                self.last_isin = self._last_isins.pop(self._next_batch)
+                self.batches += 1
+                self._next_batch += 1
+                advanced = True
+            if advanced and self.run_id is not None:
+                # Saved under the lock, so checkpoints reach Postgres in order
+                with self.connect() as conn:
+                    save_checkpoint(
+                        conn, self.run_id, self.key, self.mode, self.last_isin,
+                        self.batches, self._totals, self.watermarks
+                    )
+
+    def complete(self):
+        """Close the checkpoints of this shard once the run has gone through every batch."""
+        if self.run_id is None:
+            return
+        with self.connect() as conn:
+            complete_checkpoints(conn, self.key)
+        logger.info(f"Checkpoints of {self.key} completed after {self.batches} batches")
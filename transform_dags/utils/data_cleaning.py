@@ -1,6 +1,80 @@
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
+from functools import lru_cache, update_wrapper
 import re
+import threading
+from config.etl_config import PARSER_CACHE_SIZES
+
+MEMOIZED_PARSERS = {}  # name → MemoizedParser, for stats and resizing
+# Distinct values parse_date handed to strptime. Counted inside the memoized function,
+# so only cache misses are seen: repeats of a value served from the cache are not counted.
+PARSE_DATE_SLOW_PATH = {"count": 0}
+_parse_date_lock = threading.Lock()
+
+
+class MemoizedParser:
+    """
+    Bounded LRU cache around a pure parser. Most parsed fields have very few distinct
+    values across the catalog, so repeated values skip the regex/strptime work.
+    Unhashable inputs bypass the cache.
+    """
+
+    def __init__(self, func, maxsize):
+        self.func = func
+        self.resize(maxsize)
+        update_wrapper(self, func)
+
+    def resize(self, maxsize):
+        """Replace the cache with an empty one of the given size."""
+        self.maxsize = maxsize
+        # typed: 1, 1.0 and True must not share an entry, or results would depend on call order
+        self._cached = lru_cache(maxsize=maxsize, typed=True)(self.func)
+
+    def cache_info(self):
+        return self._cached.cache_info()
+
+    def cache_clear(self):
+        self._cached.cache_clear()
+
+    def __call__(self, *args):
+        try:
+            return self._cached(*args)
+        except TypeError:
+            # Unhashable argument (e.g. a list from BSON): parse without caching
+            return self.func(*args)
+
+
+def memoized_parser(func):
+    """Decorator registering `func` in MEMOIZED_PARSERS, sized from PARSER_CACHE_SIZES."""
+    parser = MemoizedParser(func, PARSER_CACHE_SIZES.get(func.__name__, PARSER_CACHE_SIZES["default"]))
+    MEMOIZED_PARSERS[func.__name__] = parser
+    return parser
+
+
+def configure_parser_caches(**sizes):
+    """Resize parser caches by name, e.g. configure_parser_caches(parse_date=20000)."""
+    for name, maxsize in sizes.items():
+        MEMOIZED_PARSERS[name].resize(maxsize)
+
+
+def clear_parser_caches():
+    """Empty every parser cache and reset its hit/miss counters."""
+    for parser in MEMOIZED_PARSERS.values():
+        parser.cache_clear()
+    PARSE_DATE_SLOW_PATH["count"] = 0
+
+
+def log_parser_cache_stats(logger):
+    """Log hits, misses, hit rate and fill level of every parser cache."""
+    for name, parser in MEMOIZED_PARSERS.items():
+        info = parser.cache_info()
+        calls = info.hits + info.misses
+        hit_rate = info.hits / calls * 100 if calls else 0.0
+        logger.info(
+            f"Parser cache {name}: {info.hits} hits, {info.misses} misses "
+            f"({hit_rate:.1f}% hit rate), size {info.currsize}/{info.maxsize}"
+        )
+    logger.info(f"parse_date slow path (strptime): {PARSE_DATE_SLOW_PATH['count']} distinct values (cache misses)")
 
 # def clean_string(value):
 #     """Clean string values, converting '-' to None or handling empty values."""
@@ -19,17 +93,44 @@ def clean_string(value):
     return v
 
 
+@memoized_parser
 def parse_date(date_str):
-    """Parse date string to datetime.date, return None if invalid."""
-    if not date_str or date_str.strip() in ["-", ""]:
+    """
+    Parse a DD-MM-YYYY or DD/MM/YYYY string to datetime.date, return None if invalid.
+    Native datetime/date values (from BSON) are passed through. Well-formed values are
+    sliced at fixed positions; anything else falls back to strptime.
+    """
+    if isinstance(date_str, datetime):
+        return date_str.date()
+    if isinstance(date_str, date):
+        return date_str
+    if not date_str:
+        return None
+    value = date_str.strip()
+    if value in ("-", ""):
         return None
+
+    # --- Fast path: DD-MM-YYYY / DD/MM/YYYY ---
+    # isascii: isdigit() and int() also accept other scripts' digits, which strptime rejects
+    if len(value) == 10 and value.isascii() and value[2] == value[5] and value[2] in "-/":
+        day, month, year = value[:2], value[3:5], value[6:]
+        if day.isdigit() and month.isdigit() and year.isdigit():
+            try:
+                return date(int(year), int(month), int(day))
+            except ValueError:
+                pass  # e.g. 31-02-2024: let strptime decide
+
+    # --- Slow path: unusual input (unpadded day/month, stray characters, ...) ---
+    with _parse_date_lock:
+        PARSE_DATE_SLOW_PATH["count"] += 1
     for fmt in ("%d-%m-%Y", "%d/%m/%Y"):
         try:
-            return datetime.strptime(date_str.strip(), fmt).date()
+            return datetime.strptime(value, fmt).date()
         except ValueError:
             continue
     return None
 
+@memoized_parser
 def parse_decimal(field, value):
     """Parse value to Decimal safely, return None if invalid or non-numeric."""
     value = clean_string(value)
@@ -60,6 +161,7 @@ def parse_bool(val):
     return None
 
 
+@memoized_parser
 def normalize_interest_frequency(raw_text: str) -> str:
     """
     Normalize interest payment frequency into standard categories:
@@ -96,49 +198,56 @@ def build_tenure_interval(years=0, months=0, days=0):
 
 
 
-def parse_coupon_rate(value):
-    if not value or value.strip().upper().replace(".", "") in ["-", "NA"]:
-        return None, "na"
+# Numbers are tokenized once per coupon text; keywords are plain substring checks
+_COUPON_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+_CATEGORY_RATE_RE = re.compile(r"\d+(\.\d+)?%?\s+FOR\s+CATEGORY")
+_LINKED_KEYWORDS = ("NIFTY", "G-SEC", "GSEC", "UNDERLYING", "RBI REPO", "INDEX", "EQUITY", "PERFORMANCE")
+_ZERO_COUPON_VALUES = frozenset(["ZERO COUPON", "0", "0%", "0.001", "0.01", "ON MATURITY"])
+_NA_COUPON_VALUES = frozenset(["-", "NA"])
 
 
+@memoized_parser
+def parse_coupon_rate(value):
+    """
+    Classify a coupon rate text into (rate, category), extracting its numbers once.
+    Categories, in order of precedence: na, xirr, category-specific, multi-rate,
+    reset-remark, linked, zero-coupon, fixed, unknown.
+    """
+    if not value:
+        return None, "na"
     val = value.strip().upper()
+    if val.replace(".", "") in _NA_COUPON_VALUES:
+        return None, "na"
+
+    numbers = _COUPON_NUMBER_RE.findall(val)
 
     # --- XIRR linked ---
     if "XIRR" in val:
-        matches = re.findall(r"(\d+(\.\d+)?)", val)
-        rate = float(matches[0][0]) if matches else None  # pick first number
-        return rate, "xirr"
-
+        return (float(numbers[0]) if numbers else None), "xirr"  # pick first number
 
     # --- Category-specific ---
-    if re.search(r"\d+(\.\d+)?%?\s+FOR\s+CATEGORY", val):
-        match = re.search(r"(\d+(\.\d+)?)", val)
-        return float(match.group(1)), "category-specific"
+    if "CATEGORY" in val and _CATEGORY_RATE_RE.search(val):
+        return float(numbers[0]), "category-specific"
 
     # --- Multi-rate (ranges or multiple %) ---
-    if "/" in val or "," in val:
-        matches = re.findall(r"(\d+(\.\d+)?)", val)
-        rates = [float(m[0]) for m in matches]
-        if rates:
-            return rates, "multi-rate"
+    if numbers and ("/" in val or "," in val):
+        return [float(n) for n in numbers], "multi-rate"
 
     # --- Reset/Base rate ---
     if "RESET RATE" in val or "BASE RATE" in val:
         return None, "reset-remark"
 
     # --- Linked (NIFTY, GSEC, RBI, Equity, Index, Performance) ---
-    linked_keywords = ["NIFTY","G-SEC","GSEC","UNDERLYING","RBI REPO","INDEX","EQUITY","PERFORMANCE"]
-    if any(keyword in val for keyword in linked_keywords):
+    if any(keyword in val for keyword in _LINKED_KEYWORDS):
         return None, "linked"   # always treat as linked, ignore numbers
 
     # --- Zero coupon ---
-    if val in ["ZERO COUPON", "0", "0%", "0.001", "0.01", "ON MATURITY"]:
+    if val in _ZERO_COUPON_VALUES:
         return 0.0, "zero-coupon"
 
     # --- Numeric fixed rate ---
-    numeric_match = re.search(r"(\d+(\.\d+)?)", val)
-    if numeric_match:
-        return float(numeric_match.group(1)), "fixed"
+    if numbers:
+        return float(numbers[0]), "fixed"
 
     # --- Fallback ---
-    return None, "unknown"
\ No newline at end of file
+    return None, "unknown"
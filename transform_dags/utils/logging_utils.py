@@ -1,3 +1,4 @@
+import logging
 from config.logging_config import setup_logging
 
 def log_message(logger, level, message, extra=None):
@@ -0,0 +1,179 @@
+import json
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from config.etl_config import RUN_STATS_TABLE
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+ROW_OUTCOMES = ("inserted", "updated", "skipped", "failed")
+
+
+class RunStats:
+    """
+    Per-stage timers, per-table row counters and per-ISIN latencies of one run,
+    shared by all worker threads.
+
+    Stage times are exclusive: a stage timed inside another one (e.g. ISIN discovery
+    pulled by the Mongo fetch) is subtracted from the outer stage. They are summed
+    across threads, so with several workers they can add up to more than the run.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stage_seconds = Counter()
+        self.table_counts = defaultdict(Counter)
+        self._batch_started = {}
+        self._latencies = []  # (seconds, ISIN count): every ISIN of a batch shares its latency
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def timer(self, stage):
+        """Add the time spent in the block (minus nested timers) to `stage`."""
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)  # time spent in nested timers
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self._lock:
+                self.stage_seconds[stage] += elapsed - nested
+
+    def timed(self, iterable, stage):
+        """Yield from `iterable`, timing each step as `stage` (for lazy cursors and generators)."""
+        iterator = iter(iterable)
+        while True:
+            with self.timer(stage):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count_rows(self, counts):
+        """Add {"<table> <outcome>": rows} counters (see ROW_OUTCOMES)."""
+        with self._lock:
+            for key, rows in counts.items():
+                table, outcome = key.rsplit(" ", 1)
+                self.table_counts[table][outcome] += rows
+
+    def batch_started(self, batch_no):
+        """Mark the moment a batch of ISINs has been extracted."""
+        self._batch_started[batch_no] = time.perf_counter()
+
+    def batch_finished(self, batch_no, isins):
+        """Record the extract-to-commit latency of the `isins` ISINs of a batch."""
+        started = self._batch_started.pop(batch_no, None)
+        if started is not None and isins:
+            with self._lock:
+                self._latencies.append((time.perf_counter() - started, isins))
+
+    def latency_percentiles(self, percentiles=(50, 95, 99)):
+        """Nearest-rank per-ISIN latency percentiles in milliseconds."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        total = sum(isins for _, isins in latencies)
+        result = {}
+        for percentile in percentiles:
+            if not total:
+                result[f"p{percentile}"] = None
+                continue
+            rank, seen = max(1, math.ceil(percentile / 100 * total)), 0
+            for seconds, isins in latencies:
+                seen += isins
+                if seen >= rank:
+                    result[f"p{percentile}"] = round(seconds * 1000, 3)
+                    break
+        return result
+
+    def summary(self, stats):
+        """Combine the run's ISIN stats with timings, throughput and per-table row counts."""
+        elapsed = time.perf_counter() - self.started
+        rows = sum(
+            counts[outcome] for counts in self.table_counts.values()
+            for outcome in ("inserted", "updated", "skipped")
+        )
+        return {
+            "isins": stats.get("isins", 0),
+            "loaded": stats.get("loaded", 0),
+            "failed": stats.get("failed", 0),
+            "elapsed_seconds": round(elapsed, 3),
+            "isins_per_second": round(stats.get("isins", 0) / elapsed, 2) if elapsed else None,
+            "rows_per_second": round(rows / elapsed, 2) if elapsed else None,
+            "latency_ms": self.latency_percentiles(),
+            "stage_seconds": {stage: round(seconds, 3) for stage, seconds in sorted(self.stage_seconds.items())},
+            "tables": {
+                table: {outcome: counts[outcome] for outcome in ROW_OUTCOMES}
+                for table, counts in sorted(self.table_counts.items())
+            },
+        }
+
+
+def log_run_summary(summary, label=""):
+    """Log a run summary as a few aggregate lines."""
+    latency = summary["latency_ms"]
+    logger.info(
+        f"Run stats{label}: {summary['isins']} ISINs in {summary['elapsed_seconds']}s "
+        f"({summary['isins_per_second']} ISINs/s, {summary['rows_per_second']} rows/s), "
+        f"per-ISIN latency p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms"
+    )
+    logger.info(f"Stage seconds{label}: {summary['stage_seconds']}")
+    for table, counts in summary["tables"].items():
+        logger.info(f"Table {table}{label}: {counts}")
+
+
+def ensure_run_stats_table(cur):
+    """Create the run statistics table if it does not exist yet."""
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {RUN_STATS_TABLE} (
+            id BIGSERIAL PRIMARY KEY,
+            run_id VARCHAR(255),
+            shard INTEGER,
+            num_shards INTEGER,
+            mode VARCHAR(20),
+            isins INTEGER,
+            loaded INTEGER,
+            failed INTEGER,
+            elapsed_seconds DOUBLE PRECISION,
+            isins_per_second DOUBLE PRECISION,
+            rows_per_second DOUBLE PRECISION,
+            latency_p50_ms DOUBLE PRECISION,
+            latency_p95_ms DOUBLE PRECISION,
+            latency_p99_ms DOUBLE PRECISION,
+            stage_seconds JSONB,
+            table_counts JSONB,
+            finished_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def save_run_stats(conn, summary, mode, run_id=None, shard=None, num_shards=None):
+    """Append one run summary to the run statistics table."""
+    latency = summary["latency_ms"]
+    with conn.cursor() as cur:
+        ensure_run_stats_table(cur)
+        cur.execute(
+            f"""
+            INSERT INTO {RUN_STATS_TABLE} (
+                run_id, shard, num_shards, mode, isins, loaded, failed, elapsed_seconds,
+                isins_per_second, rows_per_second, latency_p50_ms, latency_p95_ms, latency_p99_ms,
+                stage_seconds, table_counts
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            (
+                run_id, shard, num_shards, mode, summary["isins"], summary["loaded"], summary["failed"],
+                summary["elapsed_seconds"], summary["isins_per_second"], summary["rows_per_second"],
+                latency["p50"], latency["p95"], latency["p99"],
+                json.dumps(summary["stage_seconds"]), json.dumps(summary["tables"]),
+            )
+        )
+    conn.commit()
+    logger.info(f"Saved run stats to {RUN_STATS_TABLE}")
@@ -0,0 +1,188 @@
+import heapq
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby, islice
+from operator import itemgetter
+from pymongo import ASCENDING, DESCENDING
+from config.etl_config import MONGO_COLLECTIONS, MONGO_CURSOR_BATCH_SIZE
+from config.logging_config import setup_logging
+from mappings.postgres_mappings import MONGO_PROJECTIONS
+
+logger = setup_logging()
+
+
+def fetch_collection_batch(db, collection, isins):
+    """
+    Fetch all documents of one collection for a batch of ISINs with a single $in query,
+    projected to the fields the mappers read.
+    """
+    docs = {}
+    cursor = db[collection].find(
+        {"ISIN_CODE": {"$in": list(isins)}},
+        MONGO_PROJECTIONS.get(collection),
+        batch_size=MONGO_CURSOR_BATCH_SIZE,
+    )
+    for doc in cursor:
+        # Keep the first document per ISIN, same as find_one did
+        docs.setdefault(doc.get("ISIN_CODE"), doc)
+    return docs
+
+
+def fetch_batch_documents(db, isins, executor, collections=MONGO_COLLECTIONS):
+    """
+    Fetch documents for a batch of ISINs from all collections concurrently on
+    `executor`, a run-scoped thread pool (see fetch_executor).
+    Returns {isin: {collection: doc}}, the `data` shape expected by map_to_postgres.
+    """
+    if not isins:
+        return {}
+
+    futures = {
+        collection: executor.submit(fetch_collection_batch, db, collection, isins)
+        for collection in collections
+    }
+    results = {collection: future.result() for collection, future in futures.items()}
+
+    bundles = {}
+    for collection in collections:
+        for isin, doc in results[collection].items():
+            bundles.setdefault(isin, {})[collection] = doc
+    return bundles
+
+
+def fetch_executor(collections=MONGO_COLLECTIONS):
+    """Thread pool for fetch_batch_documents, created once per run: one thread per collection."""
+    return ThreadPoolExecutor(max_workers=len(collections), thread_name_prefix="isin_etl_fetch")
+
+
+def _isin_filter(after=None):
+    """ISIN_CODE condition of the sorted streams; `after` resumes past an already loaded ISIN."""
+    isin_filter = {"$exists": True, "$ne": None}
+    if after is not None:
+        isin_filter["$gt"] = after
+    return isin_filter
+
+
+def _iter_sorted_collection(db, collection, after=None):
+    """Yield (isin, collection, doc) from one collection in ISIN_CODE order, projected to the mapped fields."""
+    cursor = db[collection].find(
+        {"ISIN_CODE": _isin_filter(after)},
+        MONGO_PROJECTIONS.get(collection),
+        sort=[("ISIN_CODE", ASCENDING)],
+        allow_disk_use=True,  # falls back to a disk sort if ISIN_CODE is not indexed
+        batch_size=MONGO_CURSOR_BATCH_SIZE,
+    )
+    for doc in cursor:
+        yield doc["ISIN_CODE"], collection, doc
+
+
+def iter_isin_bundles(db, collections=MONGO_COLLECTIONS, after=None):
+    """
+    Stream one (isin, {collection: doc}) bundle per ISIN above `after` by
+    merge-joining one ISIN_CODE-sorted cursor per collection. Each cursor only
+    buffers its current batch, so memory stays flat whatever the catalog size.
+    """
+    streams = [_iter_sorted_collection(db, collection, after) for collection in collections]
+    merged = heapq.merge(*streams, key=itemgetter(0))
+    for isin, group in groupby(merged, key=itemgetter(0)):
+        bundle = {}
+        for _, collection, doc in group:
+            # Keep the first document per collection, same as find_one did
+            bundle.setdefault(collection, doc)
+        yield isin, bundle
+
+
+def chunked(iterable, size):
+    """Lazily split an iterable into lists of at most `size` items."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def get_high_watermarks(db, field, collections=MONGO_COLLECTIONS):
+    """Return {collection: max(field)}, skipping collections without the field."""
+    watermarks = {}
+    for collection in collections:
+        doc = db[collection].find_one(
+            {field: {"$exists": True}}, {field: 1}, sort=[(field, DESCENDING)]
+        )
+        if doc is not None:
+            watermarks[collection] = doc[field]
+    return watermarks
+
+
+def _iter_sorted_isins(db, collection, query, after=None):
+    """Stream the ISIN_CODE of every document matching `query` in sorted order with a key-only cursor."""
+    cursor = db[collection].find(
+        {**query, "ISIN_CODE": _isin_filter(after)},
+        {"ISIN_CODE": 1, "_id": 0},
+        sort=[("ISIN_CODE", ASCENDING)],
+        allow_disk_use=True,  # the server spills the sort to disk instead of failing
+        batch_size=MONGO_CURSOR_BATCH_SIZE,
+    )
+    for doc in cursor:
+        yield doc["ISIN_CODE"]
+
+
+def _merge_distinct(streams):
+    """Merge sorted ISIN streams into one sorted stream without duplicates."""
+    for isin, _ in groupby(heapq.merge(*streams)):
+        yield isin
+
+
+def find_changed_isins(db, field, since, until, collections=MONGO_COLLECTIONS, after=None):
+    """
+    Stream, in sorted order, the distinct ISINs above `after` with a document
+    modified in (since, until] on `field` in any collection. The per-collection
+    cursors are merge-joined, so only one cursor batch per collection is held in memory.
+    """
+    counts = Counter()
+
+    def counted(collection, isins):
+        for isin in isins:
+            counts[collection] += 1
+            yield isin
+
+    streams = []
+    for collection in collections:
+        if collection not in until:
+            continue
+        window = {"$lte": until[collection]}
+        if since.get(collection) is not None:
+            window["$gt"] = since[collection]
+        streams.append(counted(collection, _iter_sorted_isins(db, collection, {field: window}, after)))
+
+    total = 0
+    for isin in _merge_distinct(streams):
+        total += 1
+        yield isin
+
+    for collection, count in counts.items():
+        logger.info(f"Found {count} changed documents in collection {collection}")
+    logger.info(f"Total ISINs changed since last run: {total}")
+
+
+def iter_isin_codes(db, collections=MONGO_COLLECTIONS, after=None):
+    """Stream the distinct ISIN codes above `after` of all collections in sorted order using key-only cursors."""
+    return _merge_distinct([_iter_sorted_isins(db, collection, {}, after) for collection in collections])
+
+
+def iter_bundles_for_isins(db, isins, batch_size, executor, collections=MONGO_COLLECTIONS):
+    """
+    Stream (isin, {collection: doc}) bundles for an iterable of ISINs, fetching all
+    collections in $in batches (concurrently on `executor`) so every bundle is complete.
+    """
+    for batch in chunked(isins, batch_size):
+        batch_docs = fetch_batch_documents(db, batch, executor, collections)
+        for isin in batch:
+            if isin in batch_docs:
+                yield isin, batch_docs[isin]
+
+
+def isin_shard(isin, num_shards):
+    """Deterministic shard number of an ISIN (stable across processes, unlike hash())."""
+    return zlib.crc32(isin.encode()) % num_shards
@@ -0,0 +1,88 @@
+import threading
+from queue import Queue, Empty, Full
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+_DONE = object()  # end-of-stream marker passed between stages
+_POLL_SECONDS = 0.5
+
+
+def _put(queue, item, stop):
+    """Put with backpressure; give up if another stage has failed."""
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout=_POLL_SECONDS)
+            return True
+        except Full:
+            continue
+    return False
+
+
+def _get(queue, stop):
+    """Get the next item, or _DONE once another stage has failed."""
+    while not stop.is_set():
+        try:
+            return queue.get(timeout=_POLL_SECONDS)
+        except Empty:
+            continue
+    return _DONE
+
+
+def run_pipeline(items, transform, load, loaders=1, queue_size=4):
+    """
+    Run a three-stage extract → transform → load pipeline on threads.
+
+    A producer thread pulls `items` (the extract stage, e.g. a Mongo cursor stream),
+    one thread applies `transform` to each item and `loaders` threads call `load` on
+    the results. Stages are linked by bounded queues of `queue_size`, so a slow stage
+    applies backpressure instead of letting the others buffer without limit.
+    The first exception raised by any stage stops the pipeline and is re-raised here.
+    """
+    to_transform = Queue(maxsize=queue_size)
+    to_load = Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+
+    def guarded(name, fn):
+        def runner():
+            try:
+                fn()
+            except BaseException as e:
+                logger.exception(f"Pipeline stage {name} failed: {e}")
+                errors.append(e)
+                stop.set()
+        return threading.Thread(target=runner, name=f"isin_etl_{name}", daemon=True)
+
+    def extract_stage():
+        for item in items:
+            if not _put(to_transform, item, stop):
+                return
+        _put(to_transform, _DONE, stop)
+
+    def transform_stage():
+        while True:
+            item = _get(to_transform, stop)
+            if item is _DONE:
+                for _ in range(loaders):
+                    _put(to_load, _DONE, stop)
+                return
+            if not _put(to_load, transform(item), stop):
+                return
+
+    def load_stage():
+        while True:
+            item = _get(to_load, stop)
+            if item is _DONE:
+                return
+            load(item)
+
+    threads = [guarded("extract", extract_stage), guarded("transform", transform_stage)]
+    threads += [guarded(f"load_{i}", load_stage) for i in range(loaders)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
@@ -0,0 +1,81 @@
+from psycopg2.extras import execute_values
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+
+def build_upsert_sql(table, columns, conflict_column="isin_code", touch_column="last_updated"):
+    """
+    Build an INSERT ... VALUES %s ON CONFLICT DO UPDATE statement for execute_values.
+    `touch_column` is set to NOW() on update (inserts use the column default).
+    When the row carries a data_hash, rows whose stored hash is unchanged are not rewritten.
+    """
+    columns_str = ", ".join(columns)
+    update_str = ", ".join([f"{col} = EXCLUDED.{col}" for col in columns if col != conflict_column])
+    if touch_column and touch_column not in columns:
+        update_str += f", {touch_column} = NOW()"
+    sql = (
+        f"INSERT INTO {table} ({columns_str}) VALUES %s "
+        f"ON CONFLICT ({conflict_column}) DO UPDATE SET {update_str}"
+    )
+    if "data_hash" in columns:
+        sql += f" WHERE {table}.data_hash IS DISTINCT FROM EXCLUDED.data_hash"
+    return sql
+
+
+def fetch_existing_hashes(cur, table, keys, key_column="isin_code"):
+    """Prefetch stored data_hash values for a batch of keys in one query: {key: data_hash}."""
+    if not keys:
+        return {}
+    cur.execute(
+        f"SELECT {key_column}, data_hash FROM {table} WHERE {key_column} = ANY(%s)",
+        (list(keys),)
+    )
+    return dict(cur.fetchall())
+
+
+def fetch_existing_links(cur, table, id_column, isins):
+    """Prefetch the (isin_code, id) rows of a mapping table for a batch of ISINs in one query."""
+    if not isins:
+        return set()
+    cur.execute(
+        f"SELECT isin_code, {id_column} FROM {table} WHERE isin_code = ANY(%s)",
+        (list(isins),)
+    )
+    return set(cur.fetchall())
+
+
+def bulk_upsert(cur, table, columns, values, conflict_column="isin_code", returning=None, sql=None):
+    """
+    Upsert a batch of value tuples (in `columns` order) into `table` with a single
+    set-based statement. `conflict_column` values must be unique within the batch.
+    `sql` may be a prebuilt statement (e.g. TableSpec.upsert_sql) to skip building it.
+    Returns the number of rows sent, or with `returning` (a tuple of columns) the
+    rows the statement returned.
+    """
+    if not values:
+        return [] if returning else 0
+
+    if sql is None:
+        sql = build_upsert_sql(table, columns, conflict_column)
+        if returning:
+            sql += f" RETURNING {', '.join(returning)}"
+    result = execute_values(cur, sql, values, page_size=len(values), fetch=bool(returning))
+    logger.debug(f"Bulk upserted {len(values)} rows into {table}")
+    return result if returning else len(values)
+
+
+def bulk_insert_ignore(cur, table, columns, values):
+    """
+    Insert a batch of value tuples in one statement, ignoring rows that already exist.
+    Returns the number of rows actually inserted.
+    """
+    if not values:
+        return 0
+    execute_values(
+        cur,
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s ON CONFLICT DO NOTHING",
+        values,
+        page_size=len(values)
+    )
+    return cur.rowcount  # a single page, so this covers the whole batch
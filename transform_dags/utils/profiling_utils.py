@@ -0,0 +1,147 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from config.etl_config import LOG_DIR, ETL_PROFILE_EVERY, ETL_PROFILE_TOP_N
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+PROFILE_MODES = ("run", "batches")
+
+
+class RunProfiler:
+    """
+    Opt-in cProfile + tracemalloc profiling of one ETL run.
+
+    cProfile only sees the thread it is enabled on, so every profiled batch gets
+    its own profiler on the worker thread that runs it, and all of them are merged
+    into one pstats file at the end. Mode "run" profiles the calling thread for the
+    whole run plus every batch on other threads; mode "batches" profiles every
+    `every`-th batch only. tracemalloc traces the whole process while profiling is
+    on; its heaviest snapshot taken after a profiled batch is reported.
+    With mode None every method is a no-op.
+    """
+
+    def __init__(self, mode=None, label="", every=ETL_PROFILE_EVERY, top_n=ETL_PROFILE_TOP_N, out_dir=LOG_DIR):
+        if mode and mode not in PROFILE_MODES:
+            raise ValueError(f"profile must be one of {PROFILE_MODES}, got {mode!r}")
+        self.mode = mode
+        self.label = label
+        self.every = max(1, every)
+        self.top_n = top_n
+        self.out_dir = out_dir
+        self._profiles = []
+        self._main_profile = None
+        self._main_thread = None
+        self._snapshot = None
+        self._snapshot_size = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def start(self):
+        if not self.mode:
+            return
+        logger.info(f"Profiling enabled (mode {self.mode}); tracemalloc slows the run down")
+        tracemalloc.start()
+        if self.mode == "run":
+            self._main_thread = threading.get_ident()
+            self._main_profile = cProfile.Profile()
+            self._main_profile.enable()
+
+    def _sampled(self, batch_no):
+        if not self.mode or getattr(self._local, "active", False):
+            return False  # one profiler per thread at a time
+        if self.mode == "run":
+            return threading.get_ident() != self._main_thread  # the main thread is already profiled
+        return batch_no % self.every == 0
+
+    @contextmanager
+    def batch(self, batch_no):
+        """Profile the enclosed stage of batch `batch_no` if it is sampled."""
+        if not self._sampled(batch_no):
+            yield
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # Python 3.12+: only one profiler may be active per process
+            yield
+            return
+        self._local.active = True
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._local.active = False
+            self._keep_heaviest_snapshot()
+            with self._lock:
+                self._profiles.append(profile)
+
+    def _keep_heaviest_snapshot(self):
+        current, _ = tracemalloc.get_traced_memory()
+        with self._lock:
+            if current <= self._snapshot_size:
+                return
+            self._snapshot_size = current
+            self._snapshot = tracemalloc.take_snapshot()
+
+    def stop(self):
+        """Write the pstats file and allocation report, log the hot functions; returns the file paths."""
+        if not self.mode:
+            return {}
+        if self._main_profile is not None:
+            self._main_profile.disable()
+            self._profiles.append(self._main_profile)
+        self._keep_heaviest_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        base = os.path.join(self.out_dir, f"isin_etl_profile{self.label}_{stamp}")
+        paths = {}
+
+        if self._profiles:
+            stats = pstats.Stats(self._profiles[0])
+            for profile in self._profiles[1:]:
+                stats.add(profile)
+            paths["pstats"] = f"{base}.pstats"
+            stats.dump_stats(paths["pstats"])
+
+            summary = io.StringIO()
+            stats.stream = summary
+            stats.sort_stats("cumulative").print_stats(self.top_n)
+            logger.info(
+                f"Top {self.top_n} functions by cumulative time over {len(self._profiles)} profile(s):\n"
+                + _stats_table(summary.getvalue())
+            )
+
+        if self._snapshot is not None:
+            top = self._snapshot.statistics("lineno")[:self.top_n]
+            paths["allocations"] = f"{base}_alloc.txt"
+            with open(paths["allocations"], "w") as f:
+                f.write(f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB\n")
+                f.write(f"Top {self.top_n} allocation sites at {self._snapshot_size / 1024 / 1024:.1f} MiB traced:\n")
+                for stat in top:
+                    f.write(f"{stat}\n")
+            logger.info(
+                f"Peak traced memory {peak / 1024 / 1024:.1f} MiB; top allocation sites:\n"
+                + "\n".join(str(stat) for stat in top[:5])
+            )
+
+        logger.info(f"Profile written to {paths}")
+        return paths
+
+
+def _stats_table(text):
+    """Keep only the column header and rows of a pstats print_stats report."""
+    lines = text.splitlines()
+    for index, line in enumerate(lines):
+        if line.lstrip().startswith("ncalls"):
+            return "\n".join(line for line in lines[index:] if line.strip())
+    return text